@@ -0,0 +1,146 @@
+"""
+Benchmark - CSVHandler
+======================
+Compara update_posts/append_post anteriores (load_posts + merge +
+save_posts, três passadas completas pelo arquivo) com o upsert atual
+(uma leitura e uma reescrita atômica, evitada quando nada muda) e o
+append O(1) de links novos baseado no índice de links, em um CSV
+sintético.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_csv_handler.py [--rows 100000] [--repeat 5]
+
+Author: Sistema AFN
+Date: 2025-12-09
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.csv_handler import CSVHandler
+
+
+class LegacyCSVHandler(CSVHandler):
+    """Comportamento anterior: três passadas completas por atualização."""
+    
+    def update_posts(self, posts: List[Dict[str, str]]) -> bool:
+        existing_posts = self.load_posts()
+        link_map = {post.get('link'): idx for idx, post in enumerate(existing_posts)}
+        for post in posts:
+            link = post.get('link')
+            if link in link_map:
+                existing_posts[link_map[link]].update(post)
+            else:
+                existing_posts.append(post)
+        return self.save_posts(existing_posts)
+    
+    def append_post(self, post: Dict[str, str]) -> bool:
+        existing_posts = self.load_posts()
+        existing_posts.append(post)
+        return self.save_posts(existing_posts)
+
+
+def build_dataset(path: Path, rows: int) -> None:
+    """Gera CSV com metade dos posts já resumidos."""
+    resumo = "Resumo do post. " * 30
+    pd.DataFrame({
+        'post_type': [("Blog", "News", "Event")[i % 3] for i in range(rows)],
+        'title': [f"Post {i}" for i in range(rows)],
+        'cover_image': [f"https://example.com/img/{i}.png" for i in range(rows)],
+        'link': [f"https://example.com/blog/post-{i}" for i in range(rows)],
+        'resumo': [resumo if i % 2 else "" for i in range(rows)],
+        'data_resumo': ["09/12/2025 10:00" if i % 2 else "" for i in range(rows)],
+    }).to_csv(path, index=False, encoding='utf-8')
+
+
+def bench(handler: CSVHandler, rows: int, repeat: int) -> Dict[str, float]:
+    """Mede segundos por operação em cada cenário."""
+    results = {}
+    
+    # Primeira operação inclui a construção do índice de links
+    started = time.perf_counter()
+    handler.update_posts([{'link': "https://example.com/blog/post-0", 'resumo': "Novo resumo 0"}])
+    results["1a atualizacao"] = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for i in range(repeat):
+        handler.update_posts([{
+            'link': f"https://example.com/blog/post-{2 * i + 2}",
+            'resumo': f"Novo resumo {i}",
+            'data_resumo': "10/12/2025 10:00"
+        }])
+    results["atualizar 1 post"] = (time.perf_counter() - started) / repeat
+    
+    started = time.perf_counter()
+    for i in range(repeat):
+        handler.update_posts([
+            {
+                'post_type': "Blog",
+                'title': f"Novo {i}-{j}",
+                'cover_image': "",
+                'link': f"https://example.com/blog/new-{i}-{j}",
+                'resumo': "",
+                'data_resumo': ""
+            }
+            for j in range(100)
+        ])
+    results["inserir 100 posts"] = (time.perf_counter() - started) / repeat
+    
+    started = time.perf_counter()
+    for i in range(repeat):
+        handler.update_posts([{'link': "https://example.com/blog/post-2", 'resumo': "Novo resumo 0"}])
+    results["atualizacao sem mudanca"] = (time.perf_counter() - started) / repeat
+    
+    started = time.perf_counter()
+    for i in range(repeat):
+        handler.append_post({
+            'post_type': "News",
+            'title': f"Append {i}",
+            'cover_image': "",
+            'link': f"https://example.com/blog/append-{i}",
+            'resumo': "",
+            'data_resumo': ""
+        })
+    results["append_post"] = (time.perf_counter() - started) / repeat
+    
+    return results
+
+
+def main() -> int:
+    """Executa benchmark e imprime comparação."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template.csv"
+        build_dataset(template, args.rows)
+        size_mb = template.stat().st_size / 1024 / 1024
+        
+        for name, cls in (("read-merge-rewrite", LegacyCSVHandler), ("upsert atual", CSVHandler)):
+            path = Path(tmp) / f"{cls.__name__}.csv"
+            shutil.copy(template, path)
+            results[name] = bench(cls(path), args.rows, args.repeat)
+    
+    print(f"\nCSVHandler - {args.rows} linhas ({size_mb:.1f} MB), segundos por operacao\n")
+    scenarios = list(next(iter(results.values())))
+    print(f"{'cenario':<26}" + "".join(f"{name:>22}" for name in results))
+    for scenario in scenarios:
+        print(f"{scenario:<26}" + "".join(f"{values[scenario]:>22.3f}" for values in results.values()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Benchmark - DatabaseManager
+============================
+Compara a conexão por chamada (journal padrão) com a conexão persistente
+por thread em modo WAL com pragmas ajustados, além das APIs em lote.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_database.py [--ops 2000] [--readers 4]
+
+Author: Sistema AFN
+Date: 2025-12-09
+"""
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.database import DatabaseManager
+
+
+class LegacyDatabaseManager(DatabaseManager):
+    """Comportamento anterior: abre e fecha uma conexão a cada chamada."""
+    
+    @contextmanager
+    def _get_connection(self):
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def bench_sequential(db: DatabaseManager, ops: int) -> dict:
+    """Escritas e leituras sequenciais (um commit por escrita)."""
+    started = time.perf_counter()
+    for i in range(ops):
+        db.mark_as_processed(f"https://example.com/blog/post-{i}")
+    write_elapsed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for i in range(ops):
+        db.is_processed(f"https://example.com/blog/post-{i}")
+    read_elapsed = time.perf_counter() - started
+    
+    return {
+        "writes/s": ops / write_elapsed,
+        "reads/s": ops / read_elapsed
+    }
+
+
+def bench_batched(db: DatabaseManager, ops: int) -> dict:
+    """Escritas em lote (uma transação via mark_many_as_processed)."""
+    links = [f"https://example.com/blog/batch-{i}" for i in range(ops)]
+    started = time.perf_counter()
+    db.mark_many_as_processed(links)
+    elapsed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    db.get_processed_among(links)
+    read_elapsed = time.perf_counter() - started
+    
+    return {
+        "writes/s": ops / elapsed,
+        "reads/s": ops / read_elapsed
+    }
+
+
+def bench_concurrent(db: DatabaseManager, ops: int, readers: int) -> dict:
+    """Leitores concorrentes enquanto uma thread escreve."""
+    stop = threading.Event()
+    read_counts = [0] * readers
+    errors = []
+    
+    def reader(slot: int) -> None:
+        i = 0
+        while not stop.is_set():
+            try:
+                db.is_processed(f"https://example.com/blog/post-{i % ops}")
+                read_counts[slot] += 1
+            except Exception as exc:
+                errors.append(exc)
+            i += 1
+    
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    for thread in threads:
+        thread.start()
+    
+    started = time.perf_counter()
+    for i in range(ops):
+        db.mark_as_processed(f"https://example.com/blog/concurrent-{i}")
+    elapsed = time.perf_counter() - started
+    
+    stop.set()
+    for thread in threads:
+        thread.join()
+    
+    return {
+        "writes/s": ops / elapsed,
+        "reads/s": sum(read_counts) / elapsed,
+        "errors": len(errors)
+    }
+
+
+def main() -> int:
+    """Executa benchmark e imprime comparação."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, cls in (("conexao por chamada", LegacyDatabaseManager),
+                          ("persistente + WAL", DatabaseManager)):
+            db = cls(Path(tmp) / f"{cls.__name__}.db")
+            if cls is LegacyDatabaseManager:
+                # Garante journal padrão (rollback) no cenário legado
+                with db._get_connection() as conn:
+                    conn.execute("PRAGMA journal_mode=DELETE")
+            
+            results[name] = {
+                "sequencial": bench_sequential(db, args.ops),
+                "concorrente": bench_concurrent(db, args.ops, args.readers),
+                "lote": bench_batched(db, args.ops)
+            }
+            db.close()
+    
+    print(f"\nDatabaseManager - {args.ops} operacoes, {args.readers} leitores concorrentes\n")
+    print(f"{'cenario':<22}{'modo':<14}{'escritas/s':>14}{'leituras/s':>14}{'erros':>8}")
+    for name, scenarios in results.items():
+        for mode, values in scenarios.items():
+            print(
+                f"{name:<22}{mode:<14}{values['writes/s']:>14.0f}"
+                f"{values['reads/s']:>14.0f}{values.get('errors', 0):>8}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
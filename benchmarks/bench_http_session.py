@@ -0,0 +1,110 @@
+"""
+Benchmark - Sessão HTTP
+=======================
+Compara a latência por requisição de chamadas avulsas (requests.get, uma
+conexão nova por chamada) com a sessão compartilhada do HTTPSession
+(keep-alive e pool de conexões).
+
+Sem --url, usa um servidor HTTP/1.1 local; com --url, mede um endpoint
+real (em HTTPS o ganho inclui o handshake TLS evitado).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_http_session.py [--requests 200] [--url URL]
+
+Author: Sistema AFN
+Date: 2025-12-09
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import requests
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from src.utils import HTTPSession
+
+
+class ImageStubHandler(BaseHTTPRequestHandler):
+    """Responde toda requisição com uma "imagem" fixa de 50 KB."""
+    
+    protocol_version = "HTTP/1.1"
+    # Cabeçalho e corpo saem em escritas separadas: sem TCP_NODELAY o
+    # keep-alive esbarra no ACK atrasado (~40 ms), como não ocorre em servidores reais
+    disable_nagle_algorithm = True
+    body = b"\xff" * 50_000
+    
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+    
+    def log_message(self, *args) -> None:
+        pass
+
+
+def measure(get: Callable, url: str, count: int) -> List[float]:
+    """Retorna latências (ms) de requisições sequenciais."""
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = get(url, timeout=10)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Calcula mediana, p95 e média."""
+    ordered = sorted(latencies)
+    return {
+        "mediana (ms)": statistics.median(ordered),
+        "p95 (ms)": ordered[int(len(ordered) * 0.95) - 1],
+        "media (ms)": statistics.fmean(ordered),
+    }
+
+
+def main() -> int:
+    """Executa benchmark e imprime comparação."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+    
+    server = None
+    url = args.url
+    if url is None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ImageStubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/cover.jpg"
+    
+    session = HTTPSession.create()
+    session.get(url, timeout=10)  # aquece o pool (primeira conexão)
+    
+    results = {
+        "requests.get": summarize(measure(requests.get, url, args.requests)),
+        "HTTPSession": summarize(measure(session.get, url, args.requests)),
+    }
+    
+    if server:
+        server.shutdown()
+    
+    print(f"\nLatencia por requisicao - {args.requests} requisicoes sequenciais\n{url}\n")
+    print(f"{'metrica':<16}" + "".join(f"{name:>16}" for name in results) + f"{'ganho':>10}")
+    for metric in results["requests.get"]:
+        before, after = results["requests.get"][metric], results["HTTPSession"][metric]
+        print(f"{metric:<16}{before:>16.2f}{after:>16.2f}{before / after:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Benchmark - Backends de Posts (CSV x Parquet)
+=============================================
+Compara tamanho em disco e tempo das leituras analíticas (load_posts,
+get_statistics e get_posts_without_summaries) entre CSVHandler e
+ParquetHandler, no mesmo conjunto sintético do bench_csv_handler.
+
+Uso (na raiz do projeto, requer pyarrow):
+    python benchmarks/bench_posts_backend.py [--rows 100000] [--repeat 3]
+
+Author: Sistema AFN
+Date: 2025-12-09
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import pandas as pd
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from bench_csv_handler import build_dataset
+from src.csv_handler import CSVHandler, ParquetHandler
+
+
+def timed(func: Callable, repeat: int) -> float:
+    """Retorna o melhor tempo (segundos) entre as repetições."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench(handler: CSVHandler, repeat: int) -> Dict[str, float]:
+    """Mede as leituras analíticas de um backend."""
+    return {
+        "tamanho (MB)": handler.csv_path.stat().st_size / 1024 / 1024,
+        "load_posts (s)": timed(handler.load_posts, repeat),
+        "get_statistics (s)": timed(handler.get_statistics, repeat),
+        "sem resumo (s)": timed(handler.get_posts_without_summaries, repeat),
+    }
+
+
+def main() -> int:
+    """Executa benchmark e imprime comparação."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "posts.csv"
+        build_dataset(csv_path, args.rows)
+        
+        parquet = ParquetHandler(Path(tmp) / "posts.parquet")
+        started = time.perf_counter()
+        parquet._write(pd.read_csv(csv_path, dtype=str, keep_default_na=False))
+        conversion = time.perf_counter() - started
+        
+        results = {
+            "CSV": bench(CSVHandler(csv_path), args.repeat),
+            "Parquet": bench(parquet, args.repeat),
+        }
+    
+    print(f"\nBackends de posts - {args.rows} linhas (melhor de {args.repeat})\n")
+    print(f"{'metrica':<22}" + "".join(f"{name:>14}" for name in results) + f"{'ganho':>10}")
+    for metric in results["CSV"]:
+        csv_value, parquet_value = results["CSV"][metric], results["Parquet"][metric]
+        print(
+            f"{metric:<22}{csv_value:>14.3f}{parquet_value:>14.3f}"
+            f"{csv_value / parquet_value:>9.1f}x"
+        )
+    print(f"\nConversao CSV -> Parquet: {conversion:.3f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,11 +8,11 @@ Date: 2025-12-09
 """
 
 from src.main import Application
+from src.config import config
 from src.scraper import DatabricksScraper
-from src.csv_handler import CSVHandler
 from src.ai_processor import AIPostProcessor
 from src.n8n_integration import N8NIntegration
-from src.database import DatabaseManager
+from src.database import DatabaseManager, QUEUE_STAGES
 from src.logger import get_logger
 
 
@@ -47,14 +47,13 @@ def exemplo_2_scraping_apenas():
     if success:
         print("\nScraping concluido!")
         
-        # Ver resultados
-        csv_handler = CSVHandler()
-        posts = csv_handler.load_posts()
-        print(f"Total de posts extraidos: {len(posts)}")
+        # Ver resultados (posts gravados no banco)
+        stats = app.database.get_post_statistics()
+        print(f"Total de posts no banco: {stats['total_posts']}")
 
 
 def exemplo_3_processar_posts_existentes():
-    """Exemplo 3: Processar posts de CSV existente."""
+    """Exemplo 3: Processar posts pendentes no banco."""
     print("\n" + "=" * 70)
     print("EXEMPLO 3: Processar Posts Existentes")
     print("=" * 70)
@@ -94,27 +93,24 @@ def exemplo_5_uso_direto_componentes():
     scraper.cleanup()
     print(f"   Posts extraidos: {len(posts)}")
     
-    # Salvar CSV
-    print("\n2. Salvando em CSV...")
-    csv_handler = CSVHandler()
-    csv_handler.save_posts(posts)
-    print("   CSV salvo com sucesso")
+    # Gravar no banco (fonte de verdade; novos posts entram como 'discovered')
+    print("\n2. Gravando no banco...")
+    db = DatabaseManager()
+    db.upsert_posts(posts)
+    print("   Posts gravados")
     
-    # Processar com IA
+    # Processar com IA (resumos gravados no banco em lote)
     print("\n3. Processando com IA...")
     ai_processor = AIPostProcessor()
-    processed_posts = ai_processor.process_posts(posts)
-    print(f"   Posts processados: {len(processed_posts)}")
-    
-    # Atualizar CSV
-    print("\n4. Atualizando CSV...")
-    csv_handler.update_posts(processed_posts)
-    print("   CSV atualizado")
+    ai_processor.process_posts(db.load_posts(stages=QUEUE_STAGES, max_errors=config.queue_max_errors))
+    print(f"   Posts resumidos: {db.get_stage_counts().get('summarized', 0)}")
     
-    # Enviar para n8n
-    print("\n5. Enviando para n8n...")
+    # Enviar para n8n os resumidos ainda não entregues
+    print("\n4. Enviando para n8n...")
+    summarized = db.load_posts(stages=('summarized',), with_summary=True)
     n8n = N8NIntegration()
-    n8n.send_posts(processed_posts)
+    if n8n.send_posts(summarized):
+        db.advance_stage((post['link'] for post in summarized), 'delivered')
     print("   Envio concluido")
 
 
@@ -124,23 +120,27 @@ def exemplo_6_estatisticas_detalhadas():
     print("EXEMPLO 6: Estatisticas Detalhadas")
     print("=" * 70)
     
-    # Estatísticas CSV
-    csv_handler = CSVHandler()
-    csv_stats = csv_handler.get_statistics()
+    db = DatabaseManager()
+    
+    # Estatísticas dos posts (contadores mantidos pelo banco)
+    post_stats = db.get_post_statistics()
     
-    print("\nEstatisticas CSV:")
-    print(f"  Total de posts: {csv_stats['total_posts']}")
-    print(f"  Com resumo: {csv_stats['posts_with_summary']}")
-    print(f"  Sem resumo: {csv_stats['posts_without_summary']}")
+    print("\nEstatisticas dos Posts:")
+    print(f"  Total de posts: {post_stats['total_posts']}")
+    print(f"  Com resumo: {post_stats['posts_with_summary']}")
+    print(f"  Sem resumo: {post_stats['posts_without_summary']}")
     print("\n  Distribuicao por tipo:")
-    for post_type, count in csv_stats['post_types'].items():
+    for post_type, count in post_stats['post_types'].items():
         print(f"    - {post_type}: {count}")
     
-    # Estatísticas Banco de Dados
-    db = DatabaseManager()
+    print("\n  Posts por estagio:")
+    for stage, count in db.get_stage_counts().items():
+        print(f"    - {stage}: {count}")
+    
+    # Estatísticas de processamento
     db_stats = db.get_statistics()
     
-    print("\nEstatisticas Banco de Dados:")
+    print("\nEstatisticas de Processamento:")
     print(f"  Total processados: {db_stats['total_processed']}")
     print(f"  Processados hoje: {db_stats['processed_today']}")
 
@@ -151,23 +151,16 @@ def exemplo_7_processar_apenas_novos():
     print("EXEMPLO 7: Processar Apenas Novos Posts")
     print("=" * 70)
     
-    # Carregar posts do CSV
-    csv_handler = CSVHandler()
-    all_posts = csv_handler.load_posts()
-    print(f"Total de posts no CSV: {len(all_posts)}")
-    
-    # Filtrar apenas posts sem resumo
-    posts_sem_resumo = csv_handler.get_posts_without_summaries()
-    print(f"Posts sem resumo: {len(posts_sem_resumo)}")
+    # Próximos posts sem resumo (consulta pelo índice de estágio)
+    db = DatabaseManager()
+    pendentes = db.get_posts_needing_summary(limit=100)
+    print(f"Posts sem resumo (proximos 100): {len(pendentes)}")
     
-    if posts_sem_resumo:
-        # Processar apenas os novos
+    if pendentes:
+        # Reserva lotes na fila do banco e grava os resumos nele
         ai_processor = AIPostProcessor()
-        processed = ai_processor.process_posts(posts_sem_resumo)
-        
-        # Atualizar CSV
-        csv_handler.update_posts(processed)
-        print("Posts processados e CSV atualizado!")
+        processed = ai_processor.process_queue()
+        print(f"{processed} posts processados e gravados no banco!")
     else:
         print("Todos os posts ja possuem resumo!")
 
@@ -203,12 +196,12 @@ def exemplo_9_testar_n8n():
 
 
 def exemplo_10_reprocessar_tudo():
-    """Exemplo 10: Reprocessar todos os posts (limpar banco)."""
+    """Exemplo 10: Reprocessar todos os posts (recriar banco)."""
     print("\n" + "=" * 70)
     print("EXEMPLO 10: Reprocessar Todos os Posts")
     print("=" * 70)
     
-    print("\nAVISO: Isso reprocessara todos os posts!")
+    print("\nAVISO: Isso apaga o banco (posts e resumos) e refaz scraping e resumos!")
     resposta = input("Tem certeza? (s/n): ")
     
     if resposta.lower() != 's':
@@ -217,19 +210,34 @@ def exemplo_10_reprocessar_tudo():
     
     # Limpar banco de dados
     import os
-    from src.config import config
     
     db_path = config.get_database_path()
     if db_path.exists():
         os.remove(db_path)
         print("Banco de dados limpo.")
     
-    # Reprocessar
+    # O banco é a fonte de verdade: refaz o scraping antes dos resumos
     app = Application()
+    app.run_scraping()
     app.run_ai_processing()
     print("\nReprocessamento concluido!")
 
 
+def exemplo_11_exportar_dados():
+    """Exemplo 11: Exportar posts (CSV) e resumos (JSON) a partir do banco."""
+    print("\n" + "=" * 70)
+    print("EXEMPLO 11: Exportar CSV e JSON")
+    print("=" * 70)
+    
+    # Exportação completa sob demanda (export_on_finish em config.ini
+    # faz o mesmo ao final de cada execução)
+    app = Application()
+    if app.export_data():
+        print(f"\nPosts exportados para: {app.csv_handler.csv_path}")
+    else:
+        print("\nErro ao exportar. Verifique os logs.")
+
+
 def menu_interativo():
     """Menu interativo para escolher exemplos."""
     print("\n" + "=" * 70)
@@ -246,6 +254,7 @@ def menu_interativo():
     print("8.  Scraping com Filtro")
     print("9.  Testar Conexao n8n")
     print("10. Reprocessar Todos os Posts")
+    print("11. Exportar CSV e JSON")
     print("0.  Sair")
     print("=" * 70)
     
@@ -262,6 +271,7 @@ def menu_interativo():
         '8': exemplo_8_filtrar_por_tipo,
         '9': exemplo_9_testar_n8n,
         '10': exemplo_10_reprocessar_tudo,
+        '11': exemplo_11_exportar_dados,
     }
     
     if escolha in exemplos:
@@ -7,16 +7,26 @@ Author: Sistema AFN
 Date: 2025-12-09
 """
 
+import hashlib
 import json
+import math
+import re
+import threading
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 import openai
 from openai import OpenAIError
 
 from src.config import config
 from src.logger import get_logger
-from src.database import DatabaseManager
+from src.database import DatabaseManager, LeaseHeartbeat, ProcessedWriteBuffer
+from src.models import Post
+from src.utils import AtomicFile
+from src.article_extractor import ArticleContentProvider, TokenCounter
 
 
 logger = get_logger(__name__)
@@ -31,35 +41,375 @@ class OpenAIClient:
         self.client = openai.Client(api_key=config.openai_api_key)
         self.model = config.openai_model
         self.timeout = config.openai_timeout
-        logger.info(f"Cliente OpenAI inicializado - Modelo: {self.model}")
+        self.stream = config.openai_stream
+        self.prices = config.openai_model_prices
+        self.call_metrics: List[Dict] = []
+        # Chamadas não concluídas (erro de API/rede ou circuito aberto)
+        self.failed_calls = 0
+        # Contadores de tokens por modelo, para estimar uso quando a API não o informa
+        self._token_counters: Dict[str, TokenCounter] = {}
+        # Circuit breaker por modelo: falhas consecutivas e instante de abertura
+        self._circuits: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        logger.info(
+            f"Cliente OpenAI inicializado - Modelo: {self.model} "
+            f"(streaming: {'sim' if self.stream else 'nao'})"
+        )
     
-    def generate_completion(self, messages: List[Dict[str, str]]) -> Optional[str]:
+    def is_circuit_open(self, model: Optional[str] = None) -> bool:
         """
-        Gera completion usando API OpenAI.
+        Indica se o circuito do modelo está aberto (falhas recentes em sequência).
+        
+        Args:
+            model: Nome do modelo (usa o padrão se não fornecido)
+            
+        Returns:
+            True se chamadas ao modelo devem ser evitadas
+        """
+        with self._lock:
+            circuit = self._circuits.get(model or self.model)
+            if not circuit or circuit["opened_at"] is None:
+                return False
+            if time.monotonic() - circuit["opened_at"] >= config.openai_circuit_cooldown:
+                # Meia-abertura: libera uma nova tentativa
+                circuit["opened_at"] = None
+                circuit["failures"] = config.openai_circuit_failure_threshold - 1
+                return False
+            return True
+    
+    def _record_outcome(self, model: str, success: bool) -> None:
+        """Atualiza estado do circuit breaker do modelo."""
+        with self._lock:
+            circuit = self._circuits.setdefault(model, {"failures": 0, "opened_at": None})
+            if success:
+                circuit["failures"] = 0
+                circuit["opened_at"] = None
+                return
+            
+            circuit["failures"] += 1
+            if circuit["failures"] >= config.openai_circuit_failure_threshold and circuit["opened_at"] is None:
+                circuit["opened_at"] = time.monotonic()
+                logger.warning(
+                    f"Circuito aberto para o modelo {model} apos "
+                    f"{circuit['failures']} falhas consecutivas"
+                )
+    
+    def create_completion(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict] = None,
+        abort_after_chars: Optional[int] = None,
+        model: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Gera completion e retorna metadados da resposta.
         
         Args:
             messages: Lista de mensagens no formato OpenAI
+            max_tokens: Limite de tokens de saida (sem limite se None)
+            response_format: Formato de saida estruturada (ex.: json_schema)
+            abort_after_chars: Em modo streaming, aborta a requisição quando o
+                texto acumulado ultrapassar este tamanho
+            model: Modelo a usar (usa o padrão se não fornecido)
             
         Returns:
-            Texto da resposta ou None em caso de erro
+            Dicionário com content, finish_reason e usage ou None em caso de erro
+            ou circuito aberto. finish_reason é "aborted" quando o streaming foi
+            interrompido.
         """
+        model = model or self.model
+        if self.is_circuit_open(model):
+            logger.warning(f"Circuito aberto para {model} - chamada nao realizada")
+            self._count_failure()
+            return None
+        
+        request_args = {
+            "model": model,
+            "messages": messages,
+            "timeout": self.timeout
+        }
+        if max_tokens:
+            request_args["max_tokens"] = max_tokens
+        if response_format:
+            request_args["response_format"] = response_format
+        
+        started = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                timeout=self.timeout
-            )
+            if self.stream:
+                result = self._consume_stream(request_args, started, abort_after_chars)
+            else:
+                response = self.client.chat.completions.create(**request_args)
+                choice = response.choices[0]
+                result = {
+                    "content": choice.message.content or "",
+                    "finish_reason": choice.finish_reason,
+                    "usage": response.usage,
+                    "ttft": None
+                }
             
-            content = response.choices[0].message.content
-            logger.debug(f"Completion gerado com sucesso - {len(content)} caracteres")
-            return content
+            result["latency"] = time.perf_counter() - started
+            result["model"] = model
+            if result["usage"] is None:
+                # Streaming abortado termina antes do chunk final com usage
+                result["usage"] = self._estimate_usage(model, messages, result["content"])
+            self._record_outcome(model, True)
+            self._record_call(result)
+            logger.debug(
+                f"Completion gerado com sucesso ({model}) - {len(result['content'])} caracteres "
+                f"(finish_reason={result['finish_reason']}, "
+                f"latencia={result['latency']:.2f}s)"
+            )
+            return result
             
         except OpenAIError as exc:
-            logger.error(f"Erro na API OpenAI: {str(exc)}")
+            self._record_outcome(model, False)
+            self._count_failure()
+            logger.error(f"Erro na API OpenAI ({model}): {str(exc)}")
             return None
         except Exception as exc:
+            self._record_outcome(model, False)
+            self._count_failure()
             logger.error(f"Erro inesperado ao gerar completion: {str(exc)}")
             return None
+    
+    def _count_failure(self) -> None:
+        """Conta chamada não concluída (erro de API/rede ou circuito aberto)."""
+        with self._lock:
+            self.failed_calls += 1
+    
+    def get_call_counts(self) -> Tuple[int, int]:
+        """
+        Retorna contadores de chamadas para comparar antes/depois de uma operação.
+        
+        Returns:
+            Tupla (chamadas concluídas, chamadas não concluídas)
+        """
+        with self._lock:
+            return len(self.call_metrics), self.failed_calls
+    
+    def _consume_stream(
+        self,
+        request_args: Dict,
+        started: float,
+        abort_after_chars: Optional[int]
+    ) -> Dict:
+        """
+        Consome resposta em streaming, abortando se o texto passar do limite.
+        
+        Args:
+            request_args: Argumentos da requisição
+            started: Instante de início (perf_counter)
+            abort_after_chars: Tamanho máximo antes de abortar (None desativa)
+            
+        Returns:
+            Dicionário com content, finish_reason, usage e ttft
+        """
+        stream = self.client.chat.completions.create(
+            **request_args,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        parts: List[str] = []
+        length = 0
+        ttft = None
+        finish_reason = None
+        usage = None
+        
+        try:
+            for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                
+                choice = chunk.choices[0]
+                delta = choice.delta.content if choice.delta else None
+                if delta:
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    parts.append(delta)
+                    length += len(delta)
+                
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                
+                if abort_after_chars and length > abort_after_chars:
+                    finish_reason = "aborted"
+                    logger.warning(
+                        f"Streaming abortado: {length} caracteres "
+                        f"(limite {abort_after_chars})"
+                    )
+                    break
+        finally:
+            stream.close()
+        
+        return {
+            "content": "".join(parts),
+            "finish_reason": finish_reason,
+            "usage": usage,
+            "ttft": ttft
+        }
+    
+    # Tokens fixos por mensagem e de preparação da resposta no formato de chat
+    TOKENS_PER_MESSAGE = 3
+    TOKENS_REPLY_PRIMING = 3
+    
+    def _estimate_usage(self, model: str, messages: List[Dict[str, str]], content: str) -> SimpleNamespace:
+        """
+        Estima uso de tokens de uma chamada sem usage (ex.: streaming abortado).
+        
+        Args:
+            model: Nome do modelo
+            messages: Mensagens enviadas
+            content: Texto recebido até o fim da chamada
+            
+        Returns:
+            Objeto com prompt_tokens, completion_tokens e estimated=True
+        """
+        with self._lock:
+            counter = self._token_counters.get(model)
+            if counter is None:
+                counter = self._token_counters[model] = TokenCounter(model)
+        
+        prompt_tokens = self.TOKENS_REPLY_PRIMING + sum(
+            self.TOKENS_PER_MESSAGE + counter.count(message.get("content") or "")
+            for message in messages
+        )
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=counter.count(content),
+            prompt_tokens_details=None,
+            estimated=True
+        )
+    
+    @staticmethod
+    def cached_tokens(usage) -> int:
+        """
+        Extrai tokens de entrada servidos pelo cache de prompt do provedor.
+        
+        Args:
+            usage: Objeto usage da resposta
+            
+        Returns:
+            usage.prompt_tokens_details.cached_tokens (0 se ausente)
+        """
+        details = getattr(usage, "prompt_tokens_details", None)
+        return getattr(details, "cached_tokens", 0) or 0
+    
+    def estimate_cost(self, model: str, usage) -> Tuple[float, float]:
+        """
+        Estima custo (USD) de uma chamada a partir do uso de tokens.
+        
+        Tokens de entrada em cache são cobrados com o desconto configurado
+        em cached_input_discount.
+        
+        Args:
+            model: Nome do modelo
+            usage: Objeto usage da resposta (None retorna 0)
+            
+        Returns:
+            Tupla (custo estimado, economia obtida com cache de prompt)
+        """
+        price = self.prices.get(model)
+        if not usage or not price:
+            return 0.0, 0.0
+        input_price, output_price = price
+        cached = self.cached_tokens(usage)
+        savings = cached * input_price * config.openai_cached_input_discount / 1_000_000
+        cost = (
+            (usage.prompt_tokens or 0) * input_price
+            + (usage.completion_tokens or 0) * output_price
+        ) / 1_000_000
+        return cost - savings, savings
+    
+    def _record_call(self, result: Dict) -> None:
+        """Registra métricas de latência, tokens, cache e custo da chamada."""
+        usage = result.get("usage")
+        cost, savings = self.estimate_cost(result["model"], usage)
+        with self._lock:
+            self.call_metrics.append({
+                "model": result["model"],
+                "stream": self.stream,
+                "ttft": result.get("ttft"),
+                "latency": result["latency"],
+                "chars": len(result["content"]),
+                "aborted": result["finish_reason"] == "aborted",
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "cached_tokens": self.cached_tokens(usage),
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+                "usage_estimated": getattr(usage, "estimated", False),
+                "cost": cost,
+                "cache_savings": savings
+            })
+    
+    @staticmethod
+    def _aggregate(metrics: List[Dict]) -> Dict:
+        """Agrega lista de métricas de chamadas."""
+        latencies = [m["latency"] for m in metrics]
+        ttfts = [m["ttft"] for m in metrics if m["ttft"] is not None]
+        prompt_tokens = sum(m["prompt_tokens"] for m in metrics)
+        cached_tokens = sum(m["cached_tokens"] for m in metrics)
+        
+        aggregated = {
+            "calls": len(metrics),
+            "aborted": sum(1 for m in metrics if m["aborted"]),
+            "latency_avg": sum(latencies) / len(latencies),
+            "latency_max": max(latencies),
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cache_hit_ratio": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+            "completion_tokens": sum(m["completion_tokens"] for m in metrics),
+            "cost": sum(m["cost"] for m in metrics),
+            "cache_savings": sum(m["cache_savings"] for m in metrics)
+        }
+        if ttfts:
+            aggregated["ttft_avg"] = sum(ttfts) / len(ttfts)
+            aggregated["ttft_max"] = max(ttfts)
+        
+        return aggregated
+    
+    def get_metrics(self) -> Dict:
+        """
+        Retorna métricas agregadas das chamadas realizadas.
+        
+        Returns:
+            Dicionário com totais (chamadas, abortos, latências, tokens e custo)
+            e a chave per_model com os mesmos dados por modelo
+        """
+        with self._lock:
+            calls = list(self.call_metrics)
+        
+        if not calls:
+            return {"calls": 0, "aborted": 0, "per_model": {}}
+        
+        per_model: Dict[str, List[Dict]] = {}
+        for metric in calls:
+            per_model.setdefault(metric["model"], []).append(metric)
+        
+        return {
+            **self._aggregate(calls),
+            "per_model": {model: self._aggregate(items) for model, items in per_model.items()}
+        }
+    
+    def generate_completion(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Gera completion usando API OpenAI.
+        
+        Args:
+            messages: Lista de mensagens no formato OpenAI
+            max_tokens: Limite de tokens de saida (sem limite se None)
+            
+        Returns:
+            Texto da resposta ou None em caso de erro
+        """
+        result = self.create_completion(messages, max_tokens=max_tokens)
+        return result["content"] if result else None
 
 
 class SummaryGenerator:
@@ -73,167 +423,859 @@ class SummaryGenerator:
         "IMPORTANTE: Seja breve e objetivo. Priorize qualidade sobre quantidade."
     )
     
-    def __init__(self, openai_client: OpenAIClient):
+    SUMMARY_SCHEMA = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "resumo_post",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "contexto": {"type": "string"},
+                    "pontos_chave": {"type": "array", "items": {"type": "string"}},
+                    "impacto": {"type": "string"}
+                },
+                "required": ["contexto", "pontos_chave", "impacto"],
+                "additionalProperties": False
+            }
+        }
+    }
+    
+    BATCH_SCHEMA = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "resumos_posts",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "resumos": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "link": {"type": "string"},
+                                "contexto": {"type": "string"},
+                                "pontos_chave": {"type": "array", "items": {"type": "string"}},
+                                "impacto": {"type": "string"}
+                            },
+                            "required": ["link", "contexto", "pontos_chave", "impacto"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["resumos"],
+                "additionalProperties": False
+            }
+        }
+    }
+    
+    # Tokens de delimitação por post em um prompt empacotado
+    BATCH_ITEM_OVERHEAD_TOKENS = 30
+    
+    # Etapa map do modo chunked: extrai notas de um trecho do artigo.
+    # Alterar o texto exige incrementar MAP_PROMPT_VERSION (invalida o cache).
+    MAP_PROMPT = (
+        "Extraia as informacoes tecnicas essenciais do trecho de post enviado "
+        "pelo usuario em ate 5 bullets curtos. Sem introducoes, sem marketing."
+    )
+    MAP_PROMPT_VERSION = "v2"
+    MAP_MAX_TOKENS = 300
+    
+    # Checagens de qualidade da cascata de modelos: o piso de tamanho
+    # (min_summary_ratio de max_summary_chars) nunca passa desta fração do
+    # conteúdo enviado, então posts curtos podem ter resumos curtos
+    MIN_SUMMARY_SOURCE_RATIO = 0.3
+    REFUSAL_PATTERNS = re.compile(
+        r"nao (consigo|posso|tenho acesso)|não (consigo|posso|tenho acesso)|"
+        r"cannot access|can't access|unable to (access|browse)",
+        re.IGNORECASE
+    )
+    
+    # Margem de tokens para chaves/aspas do JSON e pequenas variacoes de tokenizacao
+    TOKEN_BUDGET_MARGIN = 1.15
+    MIN_KEY_POINTS = 2
+    
+    def __init__(
+        self,
+        openai_client: OpenAIClient,
+        content_provider: Optional[ArticleContentProvider] = None,
+        chunk_cache: Optional[DatabaseManager] = None
+    ):
         """
         Inicializa gerador de resumos.
         
         Args:
             openai_client: Cliente OpenAI configurado
+            content_provider: Provedor do texto dos artigos (usa config se não fornecido)
+            chunk_cache: Armazenamento dos resumos de trechos (sem cache se None)
         """
         self.client = openai_client
+        if content_provider is None and config.article_enabled:
+            content_provider = ArticleContentProvider()
+        self.content_provider = content_provider
+        self.chunk_cache = chunk_cache
+        self.counter = content_provider.counter if content_provider else TokenCounter()
+        self.escalation_model = config.openai_escalation_model if config.openai_cascade else None
+        self.cascade_stats = {"attempts": 0, "escalations": 0, "fallbacks": 0}
         self.max_chars = config.max_summary_chars
-        logger.info("SummaryGenerator inicializado")
+        self.min_summary_ratio = config.openai_min_summary_ratio
+        self.max_calls_per_post = max(1, config.openai_max_calls_per_post)
+        self.structured_output = config.openai_structured_output
+        self.trim_tolerance = config.openai_local_trim_tolerance
+        self.max_output_tokens = self._derive_token_budget()
+        self.stream_abort_chars = self.max_chars + config.openai_stream_abort_margin
+        # Prefixos estáticos calculados uma única vez (idênticos entre chamadas)
+        self.summary_prefix = self._static_prefix(self._summary_instructions())
+        self.batch_prefix = self._static_prefix(self._batch_instructions())
+        self.map_prefix = self._static_prefix(self.MAP_PROMPT)
+        logger.info(
+            f"SummaryGenerator inicializado - "
+            f"max_tokens de saida: {self.max_output_tokens}"
+        )
     
-    def generate_summary(self, link: str) -> Optional[str]:
+    def _derive_token_budget(self) -> int:
         """
-        Gera resumo de post a partir do link.
+        Deriva limite de tokens de saida a partir de max_summary_chars.
+        
+        Returns:
+            Número máximo de tokens para a resposta
+        """
+        chars_per_token = config.openai_chars_per_token or 3.5
+        return math.ceil(self.max_chars / chars_per_token * self.TOKEN_BUDGET_MARGIN)
+    
+    def _static_prefix(self, instructions: str) -> str:
+        """
+        Monta o prefixo estático (system) compartilhado por todas as chamadas.
+        
+        Todo o texto fixo vem antes do conteúdo de cada post, de modo que o
+        início das mensagens seja idêntico byte a byte entre chamadas e possa
+        ser aproveitado pelo cache de prompt do provedor.
+        
+        Args:
+            instructions: Instruções fixas da tarefa
+            
+        Returns:
+            Conteúdo da mensagem system
+        """
+        return f"{self.SYSTEM_PROMPT}\n\n{instructions}"
+    
+    def _summary_instructions(self) -> str:
+        """Instruções fixas do resumo individual."""
+        return (
+            f"Gere um resumo CONCISO do post enviado pelo usuario com MAXIMO {self.max_chars} "
+            "caracteres (OBRIGATORIO respeitar este limite).\n\n"
+            "Estrutura:\n"
+            "1. Contexto (1-2 frases): Qual problema o post aborda?\n"
+            "2. Pontos-chave (3-5 bullets curtos): Conceitos e boas praticas principais\n"
+            "3. Impacto (1-2 frases): Implicacoes praticas para projetos de dados\n\n"
+            "Regras: Seja direto, sem introducoes, sem marketing, sem emojis. "
+            "Priorize densidade de informacao. Cada frase deve agregar valor."
+        )
+    
+    def _batch_instructions(self) -> str:
+        """Instruções fixas do resumo empacotado (vários posts)."""
+        return (
+            "O usuario enviara varios posts. Gere um resumo para CADA post, identificado "
+            f"pelo link exato. Cada resumo deve ter MAXIMO {self.max_chars} caracteres "
+            "(OBRIGATORIO respeitar este limite).\n\n"
+            "Estrutura de cada resumo:\n"
+            "1. Contexto (1-2 frases): Qual problema o post aborda?\n"
+            "2. Pontos-chave (3-5 bullets curtos): Conceitos e boas praticas principais\n"
+            "3. Impacto (1-2 frases): Implicacoes praticas para projetos de dados\n\n"
+            "Regras: Seja direto, sem introducoes, sem marketing, sem emojis. "
+            "Priorize densidade de informacao. Cada frase deve agregar valor."
+        )
+    
+    def _build_messages(self, link: str, content: str = "") -> List[Dict[str, str]]:
+        """
+        Monta mensagens do prompt de resumo (prefixo estático primeiro).
         
         Args:
             link: URL do post
+            content: Texto condensado do artigo (vazio usa apenas o link)
             
         Returns:
-            Texto do resumo ou None em caso de erro
+            Lista de mensagens no formato OpenAI
         """
-        messages = [
+        if content:
+            source = f"Post: {link}\n\nConteudo do post:\n\"\"\"\n{content}\n\"\"\""
+        else:
+            source = f"Leia o post: {link}"
+        
+        return [
             {
                 "role": "system",
-                "content": self.SYSTEM_PROMPT
+                "content": self.summary_prefix
             },
+            {
+                "role": "user",
+                "content": source
+            }
+        ]
+    
+    def _request_summary(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> Optional[Dict]:
+        """
+        Executa chamada de resumo com orcamento de tokens.
+        
+        Args:
+            messages: Mensagens do prompt
+            model: Modelo a usar (usa o padrão do cliente se None)
+            
+        Returns:
+            Dicionário com sections (estruturado ou None), text e truncated,
+            ou None em caso de erro
+        """
+        result = self.client.create_completion(
+            messages,
+            max_tokens=self.max_output_tokens,
+            response_format=self.SUMMARY_SCHEMA if self.structured_output else None,
+            abort_after_chars=self.stream_abort_chars,
+            model=model
+        )
+        
+        if not result or not result["content"]:
+            return None
+        
+        raw = result["content"]
+        sections = self._parse_sections(raw) if self.structured_output else None
+        text = self._compose_summary(sections) if sections else raw.strip()
+        
+        return {
+            "raw": raw,
+            "sections": sections,
+            "text": text,
+            "truncated": result["finish_reason"] in ("length", "aborted")
+        }
+    
+    @staticmethod
+    def _parse_sections(raw: str) -> Optional[Dict]:
+        """
+        Interpreta resposta estruturada do modelo.
+        
+        Args:
+            raw: Conteúdo JSON retornado
+            
+        Returns:
+            Dicionário com contexto, pontos_chave e impacto ou None se inválido
+        """
+        try:
+            data = json.loads(raw)
+        except (json.JSONDecodeError, TypeError):
+            return None
+        
+        if not isinstance(data, dict) or not isinstance(data.get("pontos_chave"), list):
+            return None
+        
+        return {
+            "contexto": str(data.get("contexto", "")).strip(),
+            "pontos_chave": [str(p).strip() for p in data["pontos_chave"] if str(p).strip()],
+            "impacto": str(data.get("impacto", "")).strip()
+        }
+    
+    @staticmethod
+    def _compose_summary(sections: Dict) -> str:
+        """
+        Converte resumo estruturado em texto final.
+        
+        Args:
+            sections: Dicionário com contexto, pontos_chave e impacto
+            
+        Returns:
+            Texto do resumo
+        """
+        blocks = []
+        if sections["contexto"]:
+            blocks.append(sections["contexto"])
+        if sections["pontos_chave"]:
+            blocks.append("\n".join(f"- {point}" for point in sections["pontos_chave"]))
+        if sections["impacto"]:
+            blocks.append(sections["impacto"])
+        return "\n\n".join(blocks)
+    
+    def _trim_locally(self, candidate: Dict) -> str:
+        """
+        Ajusta resumo ao limite sem nova chamada à API.
+        
+        Remove pontos-chave do final (mantendo um mínimo) e, se ainda
+        necessário, corta o texto na última frase completa.
+        
+        Args:
+            candidate: Resultado de _request_summary
+            
+        Returns:
+            Texto com no máximo max_chars caracteres
+        """
+        sections = candidate.get("sections")
+        text = candidate["text"]
+        
+        if sections:
+            sections = {**sections, "pontos_chave": list(sections["pontos_chave"])}
+            while (
+                len(text) > self.max_chars
+                and len(sections["pontos_chave"]) > self.MIN_KEY_POINTS
+            ):
+                sections["pontos_chave"].pop()
+                text = self._compose_summary(sections)
+        
+        if len(text) <= self.max_chars:
+            return text
+        
+        cut = text[:self.max_chars]
+        boundary = max(cut.rfind(". "), cut.rfind(".\n"), cut.rfind("\n"))
+        if boundary > self.max_chars // 2:
+            cut = cut[:boundary + 1]
+        return cut.rstrip()
+    
+    def _request_shorter(
+        self,
+        messages: List[Dict[str, str]],
+        candidate: Dict,
+        model: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Solicita versao encurtada do resumo (única chamada extra permitida).
+        
+        Args:
+            messages: Mensagens originais do prompt
+            candidate: Resultado acima do limite
+            model: Modelo a usar (usa o padrão do cliente se None)
+            
+        Returns:
+            Novo resultado ou None em caso de erro
+        """
+        target = int(self.max_chars * 0.85)
+        follow_up = messages + [
+            {"role": "assistant", "content": candidate["raw"]},
             {
                 "role": "user",
                 "content": (
-                    f"Leia o post: {link}\n\n"
-                    f"Gere um resumo CONCISO com MAXIMO {self.max_chars} caracteres (OBRIGATORIO respeitar este limite).\n\n"
-                    "Estrutura:\n"
-                    "1. Contexto (1-2 frases): Qual problema o post aborda?\n"
-                    "2. Pontos-chave (3-5 bullets curtos): Conceitos e boas praticas principais\n"
-                    "3. Impacto (1-2 frases): Implicacoes praticas para projetos de dados\n\n"
-                    "Regras: Seja direto, sem introducoes, sem marketing, sem emojis. "
-                    "Priorize densidade de informacao. Cada frase deve agregar valor."
+                    f"O resumo excedeu o limite ({len(candidate['text'])}/{self.max_chars} caracteres"
+                    f"{', resposta truncada' if candidate['truncated'] else ''}). "
+                    f"Reescreva com no maximo {target} caracteres, mantendo a mesma estrutura "
+                    "e apenas as informacoes mais importantes."
                 )
             }
         ]
+        return self._request_summary(follow_up, model)
+    
+    def generate_summary(self, link: str, content: Optional[str] = None) -> Optional[str]:
+        """
+        Gera resumo de post a partir do link.
+        
+        A saída é limitada por max_tokens derivado de max_summary_chars. Se ainda
+        assim exceder o limite, pequenos excessos são cortados localmente e
+        excessos maiores (ou respostas truncadas) disparam uma chamada de
+        "encurtar".
+        
+        Com cascata ativa, o modelo barato é tentado primeiro; o modelo de
+        escalonamento só é usado se o resultado falhar na validação/checagens
+        de qualidade ou se o circuito do modelo barato estiver aberto.
+        
+        Encurtar e escalonar dividem o mesmo orçamento: o post nunca gera
+        mais de max_calls_per_post chamadas de resumo.
+        
+        Args:
+            link: URL do post
+            content: Conteúdo já preparado (obtido via prepare_content se None)
+            
+        Returns:
+            Texto do resumo ou None em caso de erro
+        """
+        if content is None:
+            content = self.prepare_content(link)
+        if not content:
+            logger.warning(f"Conteudo do artigo indisponivel - usando apenas o link: {link}")
+        messages = self._build_messages(link, content)
         
         logger.info(f"Gerando resumo para: {link}")
-        summary = self.client.generate_completion(messages)
         
-        if summary:
-            logger.info(f"Resumo gerado com sucesso - {len(summary)} caracteres")
+        primary = self.client.model
+        if not self.escalation_model:
+            summary, _ = self._generate_with_model(messages, link, primary, self.max_calls_per_post)
+            return summary
+        
+        self.cascade_stats["attempts"] += 1
+        summary = None
+        calls = 0
+        if self.client.is_circuit_open(primary):
+            reason = f"circuito aberto para {primary}"
         else:
-            logger.warning(f"Falha ao gerar resumo para: {link}")
+            summary, calls = self._generate_with_model(messages, link, primary, self.max_calls_per_post)
+            issues = self.quality_issues(summary, content) if summary else ["sem resumo valido"]
+            if not issues:
+                return summary
+            reason = ", ".join(issues)
         
-        return summary
+        fallback = summary if summary and self.validate_summary(summary) else None
+        return self._escalate(messages, link, reason, fallback, self.max_calls_per_post - calls)
     
-    def validate_summary(self, summary: str) -> bool:
+    def _escalate(
+        self,
+        messages: List[Dict[str, str]],
+        link: str,
+        reason: str,
+        fallback: Optional[str] = None,
+        max_calls: int = 1
+    ) -> Optional[str]:
         """
-        Valida se resumo atende aos critérios.
+        Refaz o resumo com o modelo de escalonamento.
+        
+        Se o escalonamento não produzir resumo válido (erro, circuito aberto
+        ou saída inválida) ou o orçamento de chamadas do post já acabou, o
+        resumo do modelo barato que passou na validação é mantido: a chamada
+        já paga não é descartada.
         
         Args:
-            summary: Texto do resumo
+            messages: Mensagens do prompt
+            link: URL do post (para log)
+            reason: Motivo do escalonamento
+            fallback: Resumo válido do modelo barato (None se não houver)
+            max_calls: Chamadas ainda permitidas para o post
             
         Returns:
-            True se válido
+            Resumo escalonado, o fallback ou None
         """
-        if not summary or not summary.strip():
-            return False
-        
-        if len(summary) > self.max_chars:
-            logger.warning(
-                f"Resumo excede limite de caracteres: "
-                f"{len(summary)}/{self.max_chars}"
+        if max_calls < 1:
+            logger.info(
+                f"Limite de {self.max_calls_per_post} chamadas por post atingido - "
+                f"sem escalonamento ({reason}): {link}"
             )
-            return False
+            return fallback
         
-        return True
-
-
-class SummaryStorage:
-    """Gerenciador de armazenamento de resumos."""
+        self.cascade_stats["escalations"] += 1
+        logger.info(f"Escalonando para {self.escalation_model} ({reason}): {link}")
+        summary, _ = self._generate_with_model(messages, link, self.escalation_model, max_calls)
+        if summary and self.validate_summary(summary):
+            return summary
+        
+        if fallback:
+            self.cascade_stats["fallbacks"] += 1
+            logger.warning(f"Escalonamento sem resumo valido - mantendo resumo de {self.client.model}: {link}")
+        return fallback
     
-    SEPARATOR = "\n" + ("-" * 50) + "\n"
+    def _generate_with_model(
+        self,
+        messages: List[Dict[str, str]],
+        link: str,
+        model: str,
+        max_calls: int = 2
+    ) -> Tuple[Optional[str], int]:
+        """
+        Gera resumo com um modelo específico, ajustando-o ao limite.
+        
+        Args:
+            messages: Mensagens do prompt
+            link: URL do post (para log)
+            model: Modelo a usar
+            max_calls: Chamadas permitidas (com 1, excessos só são cortados localmente)
+            
+        Returns:
+            Tupla (texto do resumo ou None em caso de erro, chamadas feitas)
+        """
+        candidate = self._request_summary(messages, model)
+        
+        if not candidate:
+            logger.warning(f"Falha ao gerar resumo ({model}) para: {link}")
+            return None, 1
+        
+        summary, extra_calls = self._fit_to_limit(
+            messages, candidate, link, model, allow_shorten=max_calls > 1
+        )
+        if not summary:
+            logger.warning(f"Resposta truncada e sem versao utilizavel ({model}) para: {link}")
+            return None, 1 + extra_calls
+        
+        logger.info(f"Resumo gerado com sucesso ({model}) - {len(summary)} caracteres")
+        return summary, 1 + extra_calls
     
-    def __init__(self, storage_path: Path = None):
+    def quality_issues(self, summary: str, content: str = "") -> List[str]:
         """
-        Inicializa gerenciador de armazenamento.
+        Checagens locais de qualidade usadas para decidir o escalonamento.
         
         Args:
-            storage_path: Caminho do arquivo JSON (usa config se não fornecido)
+            summary: Texto do resumo
+            content: Conteúdo enviado ao modelo (limita o piso de tamanho)
+            
+        Returns:
+            Lista de problemas encontrados (vazia se o resumo é aceitável)
         """
-        self.storage_path = storage_path or Path(config.output_summaries_json)
-        self._ensure_storage_exists()
-        logger.info(f"SummaryStorage inicializado: {self.storage_path}")
+        if not self.validate_summary(summary):
+            return ["falhou na validacao"]
+        
+        issues = []
+        min_chars = self.max_chars * self.min_summary_ratio
+        if content:
+            min_chars = min(min_chars, len(content) * self.MIN_SUMMARY_SOURCE_RATIO)
+        if len(summary) < min_chars:
+            issues.append("resumo muito curto")
+        if self.REFUSAL_PATTERNS.search(summary):
+            issues.append("modelo nao teve acesso ao conteudo")
+        if self.structured_output and summary.count("\n- ") < self.MIN_KEY_POINTS:
+            issues.append("poucos pontos-chave")
+        return issues
     
-    def _ensure_storage_exists(self) -> None:
-        """Garante que arquivo de armazenamento existe."""
-        if not self.storage_path.exists():
-            self._save_summaries([])
-            logger.info("Arquivo de armazenamento criado")
+    def prepare_content(self, link: str) -> str:
+        """
+        Obtém o conteúdo do artigo para o prompt de resumo.
+        
+        Artigos acima de chunked_threshold_tokens passam pelo modo map-reduce:
+        cada trecho vira notas curtas (em paralelo e com cache por hash) e as
+        notas substituem o texto integral no prompt final.
+        
+        Args:
+            link: URL do post
+            
+        Returns:
+            Texto a enviar (vazio se indisponível)
+        """
+        if not self.content_provider:
+            return ""
+        
+        paragraphs = self.content_provider.get_paragraphs(link)
+        if not paragraphs:
+            return ""
+        
+        total_tokens = self.content_provider.count_tokens(paragraphs)
+        if config.article_chunked_mode and total_tokens > config.article_chunked_threshold_tokens:
+            notes = self._map_chunks(link, self.content_provider.split_chunks(paragraphs))
+            if notes:
+                return self.content_provider.condense(notes)
+            logger.warning(f"Modo chunked sem notas - usando artigo condensado: {link}")
+        
+        return self.content_provider.condense(paragraphs)
     
-    def load_summaries(self) -> List[Dict]:
+    def plan_batches(self, items: List[Tuple[str, str]]) -> Tuple[List[List[Tuple[str, str]]], List[Tuple[str, str]]]:
         """
-        Carrega resumos do arquivo JSON.
+        Agrupa posts curtos em pacotes dimensionados pelos orçamentos de tokens.
+        
+        O número de posts por pacote é o maior que respeita batch_max_input_tokens
+        (conteúdo somado), batch_max_output_tokens (N resumos) e batch_max_posts.
         
+        Args:
+            items: Pares (link, conteúdo) já preparados
+            
         Returns:
-            Lista de dicionários com resumos
+            Tupla (pacotes com 2+ posts, posts para o caminho individual)
         """
-        try:
-            with open(self.storage_path, 'r', encoding='utf-8') as f:
-                summaries = json.load(f)
+        max_posts = min(
+            config.openai_batch_max_posts,
+            config.openai_batch_max_output_tokens // max(self.max_output_tokens, 1)
+        )
+        if max_posts < 2:
+            return [], list(items)
+        
+        input_budget = config.openai_batch_max_input_tokens
+        batches: List[List[Tuple[str, str]]] = []
+        singles: List[Tuple[str, str]] = []
+        current: List[Tuple[str, str]] = []
+        current_tokens = 0
+        
+        for link, content in items:
+            cost = self.counter.count(content) + self.counter.count(link) + self.BATCH_ITEM_OVERHEAD_TOKENS
+            if cost > config.openai_batch_short_post_tokens:
+                singles.append((link, content))
+                continue
             
-            logger.debug(f"Carregados {len(summaries)} resumos do storage")
-            return summaries
+            if current and (len(current) >= max_posts or current_tokens + cost > input_budget):
+                batches.append(current)
+                current, current_tokens = [], 0
             
-        except json.JSONDecodeError as exc:
-            logger.error(f"Erro ao decodificar JSON: {str(exc)}")
-            return []
-        except Exception as exc:
-            logger.error(f"Erro ao carregar resumos: {str(exc)}")
-            return []
+            current.append((link, content))
+            current_tokens += cost
+        
+        if current:
+            batches.append(current)
+        
+        # Pacotes de um único post não amortizam nada
+        singles.extend(batch[0] for batch in batches if len(batch) == 1)
+        return [batch for batch in batches if len(batch) > 1], singles
     
-    def _save_summaries(self, summaries: List[Dict]) -> bool:
+    def _build_batch_messages(self, items: List[Tuple[str, str]]) -> List[Dict[str, str]]:
         """
-        Salva resumos no arquivo JSON.
+        Monta mensagens de um prompt empacotado com vários posts.
         
         Args:
-            summaries: Lista de resumos
+            items: Pares (link, conteúdo)
             
         Returns:
-            True se sucesso
+            Lista de mensagens no formato OpenAI
         """
+        posts_block = "\n\n".join(
+            f"### Post {idx}\nLink: {link}\n"
+            + (f"Conteudo:\n\"\"\"\n{content}\n\"\"\"" if content else "Conteudo: indisponivel")
+            for idx, (link, content) in enumerate(items, 1)
+        )
+        return [
+            {
+                "role": "system",
+                "content": self.batch_prefix
+            },
+            {
+                "role": "user",
+                "content": posts_block
+            }
+        ]
+    
+    def generate_batch(self, items: List[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        Gera resumos de vários posts em uma única chamada.
+        
+        Itens ausentes, malformados ou que não cabem no limite após o ajuste
+        local não são retornados: o chamador deve usar o caminho individual.
+        
+        Args:
+            items: Pares (link, conteúdo)
+            
+        Returns:
+            Dicionário link -> resumo apenas para os itens válidos
+        """
+        requested = {link for link, _ in items}
+        result = self.client.create_completion(
+            self._build_batch_messages(items),
+            max_tokens=self.max_output_tokens * len(items),
+            response_format=self.BATCH_SCHEMA,
+            abort_after_chars=self.stream_abort_chars * len(items)
+        )
+        if not result or not result["content"]:
+            return {}
+        
         try:
-            with open(self.storage_path, 'w', encoding='utf-8') as f:
-                json.dump(summaries, f, indent=2, ensure_ascii=False)
+            entries = json.loads(result["content"]).get("resumos", [])
+        except (json.JSONDecodeError, AttributeError):
+            logger.warning(
+                f"Resposta empacotada invalida (finish_reason={result['finish_reason']}) - "
+                f"{len(items)} posts voltam ao caminho individual"
+            )
+            return {}
+        
+        contents = dict(items)
+        summaries: Dict[str, str] = {}
+        for entry in entries if isinstance(entries, list) else []:
+            link = entry.get("link") if isinstance(entry, dict) else None
+            if link not in requested or link in summaries:
+                continue
             
-            logger.debug(f"Salvos {len(summaries)} resumos no storage")
-            return True
+            sections = self._parse_sections(json.dumps(entry))
+            if not sections:
+                continue
             
-        except Exception as exc:
-            logger.error(f"Erro ao salvar resumos: {str(exc)}")
+            candidate = {"sections": sections, "text": self._compose_summary(sections)}
+            overshoot = (len(candidate["text"]) - self.max_chars) / self.max_chars
+            if overshoot > self.trim_tolerance:
+                continue
+            
+            summary = self._trim_locally(candidate)
+            if not self.validate_summary(summary):
+                continue
+            
+            # Cascata também para posts empacotados: problemas de qualidade
+            # escalonam apenas este post, mantendo o resumo do lote como fallback
+            if self.escalation_model:
+                self.cascade_stats["attempts"] += 1
+                issues = self.quality_issues(summary, contents.get(link, ""))
+                if issues:
+                    # A chamada do lote conta como a primeira do post
+                    messages = self._build_messages(link, contents.get(link, ""))
+                    summary = self._escalate(
+                        messages, link, ", ".join(issues), summary, self.max_calls_per_post - 1
+                    )
+            summaries[link] = summary
+        
+        return summaries
+    
+    def _chunk_key(self, chunk: str) -> str:
+        """Hash do trecho, do modelo e da versão do prompt map."""
+        payload = f"{self.MAP_PROMPT_VERSION}|{self.client.model}|{chunk}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _map_chunks(self, link: str, chunks: List[str]) -> List[str]:
+        """
+        Resume trechos em paralelo, reaproveitando resumos em cache.
+        
+        Args:
+            link: URL do post (para log)
+            chunks: Trechos do artigo
+            
+        Returns:
+            Notas por trecho, na ordem do artigo (trechos com falha são omitidos)
+        """
+        keys = [self._chunk_key(chunk) for chunk in chunks]
+        cached = self.chunk_cache.get_chunk_summaries(keys) if self.chunk_cache else {}
+        pending = {key: chunk for key, chunk in zip(keys, chunks) if key not in cached}
+        
+        logger.info(
+            f"Modo chunked: {len(chunks)} trechos "
+            f"({len(chunks) - len(pending)} em cache) - {link}"
+        )
+        
+        fresh: Dict[str, str] = {}
+        if pending:
+            workers = max(1, min(config.article_chunk_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self._summarize_chunk, chunk): key
+                    for key, chunk in pending.items()
+                }
+                for future in as_completed(futures):
+                    note = future.result()
+                    if note:
+                        fresh[futures[future]] = note
+            
+            if self.chunk_cache and fresh:
+                self.chunk_cache.save_chunk_summaries(fresh)
+        
+        notes = {**cached, **fresh}
+        return [notes[key] for key in keys if key in notes]
+    
+    def _summarize_chunk(self, chunk: str) -> Optional[str]:
+        """
+        Etapa map: gera notas curtas de um trecho.
+        
+        Args:
+            chunk: Texto do trecho
+            
+        Returns:
+            Notas do trecho ou None em caso de erro
+        """
+        messages = [
+            {"role": "system", "content": self.map_prefix},
+            {"role": "user", "content": f"\"\"\"\n{chunk}\n\"\"\""}
+        ]
+        result = self.client.create_completion(messages, max_tokens=self.MAP_MAX_TOKENS)
+        if not result or not result["content"].strip():
+            return None
+        return result["content"].strip()
+    
+    def _fit_to_limit(
+        self,
+        messages: List[Dict[str, str]],
+        candidate: Dict,
+        link: str,
+        model: Optional[str] = None,
+        allow_shorten: bool = True
+    ) -> Tuple[Optional[str], int]:
+        """
+        Garante que o resumo respeite max_chars gastando no máximo uma chamada extra.
+        
+        Args:
+            messages: Mensagens originais do prompt
+            candidate: Resultado da primeira chamada
+            link: URL do post (para log)
+            model: Modelo da chamada original
+            allow_shorten: Se o orçamento do post ainda permite a chamada de "encurtar"
+            
+        Returns:
+            Tupla (texto dentro do limite ou None se nenhuma resposta for
+            utilizável, chamadas extras feitas)
+        """
+        length = len(candidate["text"])
+        if length <= self.max_chars and not candidate["truncated"]:
+            return candidate["text"], 0
+        
+        overshoot = (length - self.max_chars) / self.max_chars
+        if self._is_usable(candidate) and (overshoot <= self.trim_tolerance or not allow_shorten):
+            logger.info(f"Resumo com {length}/{self.max_chars} caracteres - ajuste local")
+            return self._trim_locally(candidate), 0
+        
+        if not allow_shorten:
+            return None, 0
+        
+        logger.info(
+            f"Resumo com {length}/{self.max_chars} caracteres "
+            f"(truncado={candidate['truncated']}) - solicitando versao curta: {link}"
+        )
+        shorter = self._request_shorter(messages, candidate, model)
+        if shorter and self._is_usable(shorter):
+            candidate = shorter
+        
+        if not self._is_usable(candidate):
+            return None, 1
+        
+        return self._trim_locally(candidate), 1
+    
+    def _is_usable(self, candidate: Dict) -> bool:
+        """Indica se o resultado pode ser ajustado localmente (JSON válido quando estruturado)."""
+        if not candidate["text"]:
             return False
+        return not self.structured_output or candidate["sections"] is not None
     
-    def save_summary(self, summary_data: Dict) -> bool:
+    def validate_summary(self, summary: str) -> bool:
         """
-        Adiciona novo resumo ao storage.
+        Valida se resumo atende aos critérios.
         
         Args:
-            summary_data: Dicionário com dados do resumo
+            summary: Texto do resumo
             
         Returns:
-            True se sucesso
+            True se válido
         """
-        summaries = self.load_summaries()
-        summaries.append(summary_data)
-        return self._save_summaries(summaries)
+        if not summary or not summary.strip():
+            return False
+        
+        if len(summary) > self.max_chars:
+            logger.warning(
+                f"Resumo excede limite de caracteres: "
+                f"{len(summary)}/{self.max_chars}"
+            )
+            return False
+        
+        return True
+
+
+class SummaryStorage:
+    """
+    Leitura dos resumos gravados por versões anteriores.
     
-    def get_processed_links(self) -> set:
+    A fonte de verdade dos resumos é a tabela posts do banco; esta classe
+    apenas lê os arquivos antigos (JSONL append-only ou JSON legado) para a
+    importação feita em Application._import_legacy_files, sem alterá-los.
+    """
+    
+    SEPARATOR = "\n" + ("-" * 50) + "\n"
+    
+    def __init__(self, storage_path: Path = None):
         """
-        Retorna conjunto de links que já possuem resumo.
+        Inicializa leitor.
+        
+        Args:
+            storage_path: Arquivo .jsonl ou .json (usa output_summaries_jsonl se não fornecido)
+        """
+        self.storage_path = Path(storage_path or config.output_summaries_jsonl)
+    
+    def load_summaries(self) -> List[Dict]:
+        """
+        Carrega os resumos do arquivo (um registro por linha em .jsonl, lista em .json).
+        
+        Linhas corrompidas do JSONL (ex.: escrita interrompida) são ignoradas.
         
         Returns:
-            Set de URLs
+            Lista de dicionários com resumos (vazia se o arquivo não existe)
         """
-        summaries = self.load_summaries()
-        return {item.get("link") for item in summaries if item.get("link")}
+        if not self.storage_path.is_file():
+            return []
+        
+        try:
+            with open(self.storage_path, 'r', encoding='utf-8', errors='replace') as f:
+                if self.storage_path.suffix != '.jsonl':
+                    summaries = json.load(f)
+                    return summaries if isinstance(summaries, list) else []
+                
+                summaries = []
+                for number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        summaries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.warning(f"Linha invalida ignorada em {self.storage_path} (linha {number})")
+            
+            logger.debug(f"Carregados {len(summaries)} resumos de {self.storage_path}")
+            return summaries
+            
+        except (json.JSONDecodeError, OSError) as exc:
+            logger.error(f"Erro ao carregar resumos de {self.storage_path}: {str(exc)}")
+            return []
 
 
 class AIPostProcessor:
@@ -242,12 +1284,12 @@ class AIPostProcessor:
     def __init__(self):
         """Inicializa processador de IA."""
         self.openai_client = OpenAIClient()
-        self.summary_generator = SummaryGenerator(self.openai_client)
-        self.summary_storage = SummaryStorage()
         self.database = DatabaseManager()
+        self.processed_buffer = ProcessedWriteBuffer(self.database)
+        self.summary_generator = SummaryGenerator(self.openai_client, chunk_cache=self.database)
         logger.info("AIPostProcessor inicializado")
     
-    def process_posts(self, posts: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    def process_posts(self, posts: List[Post]) -> List[Post]:
         """
         Processa lista de posts gerando resumos.
         
@@ -265,54 +1307,224 @@ class AIPostProcessor:
         
         processed_count = 0
         skipped_count = 0
+        pending = []
+        
+        # Verifica todos os links já processados em uma única consulta
+        processed_links = self.database.get_processed_among(
+            post.get("link", "") for post in posts
+        )
         
         for idx, post in enumerate(posts, 1):
             link = post.get("link", "")
             
             # Verifica se já foi processado
-            if self.database.is_processed(link):
+            if link in processed_links:
                 logger.info(f"[{idx}/{len(posts)}] Post ja processado - pulando: {link}")
                 skipped_count += 1
                 continue
             
-            logger.info(f"[{idx}/{len(posts)}] Processando post: {link}")
+            pending.append((idx, post))
+        
+        self.database.register_discovered(post.get("link", "") for _, post in pending)
+        
+        # Modo empacotado: posts curtos resumidos em lote; o restante (e falhas
+        # do lote) segue pelo caminho individual abaixo
+        contents: Dict[str, str] = {}
+        batch_summaries: Dict[str, str] = {}
+        if config.openai_batch_mode and len(pending) > 1:
+            for _, post in pending:
+                link = post.get("link", "")
+                contents[link] = self.summary_generator.prepare_content(link)
+            self.database.advance_stage(
+                (link for link, content in contents.items() if content), 'enriched'
+            )
+            batch_summaries = self._summarize_in_batches(list(contents.items()))
+        
+        for idx, post in pending:
+            link = post.get("link", "")
             
-            # Gera resumo
-            summary = self.summary_generator.generate_summary(link)
+            summary = batch_summaries.get(link)
+            completed_before, failed_before = self.openai_client.get_call_counts()
+            if summary is None:
+                logger.info(f"[{idx}/{len(posts)}] Processando post: {link}")
+                content = contents.get(link)
+                if content is None:
+                    content = self.summary_generator.prepare_content(link)
+                    if content:
+                        self.database.advance_stage([link], 'enriched')
+                # Após prepare_content: chamadas do map de chunks que deram
+                # certo não podem mascarar uma falha de rede no resumo
+                completed_before, failed_before = self.openai_client.get_call_counts()
+                summary = self.summary_generator.generate_summary(link, content)
             
             if not summary or not self.summary_generator.validate_summary(summary):
-                logger.warning(f"Resumo invalido para: {link}")
+                completed, failed = self.openai_client.get_call_counts()
+                if completed == completed_before and failed > failed_before:
+                    # Nenhuma resposta recebida: falha de rede/API ou circuito aberto
+                    logger.warning(f"Falha transitoria ao resumir: {link}")
+                    self.database.record_stage_error(link, "falha na chamada OpenAI", transient=True)
+                else:
+                    logger.warning(f"Resumo invalido para: {link}")
+                    self.database.record_stage_error(link, "resumo invalido")
                 continue
             
-            # Adiciona resumo ao post
-            timestamp = datetime.now().strftime("%d/%m/%Y %H:%M")
-            post["resumo"] = self.summary_storage.SEPARATOR + summary
-            post["data_resumo"] = timestamp
-            
-            # Salva resumo
-            summary_record = {
-                "titulo": post.get("title", ""),
-                "link": link,
-                "data": timestamp,
-                "conteudo": summary
-            }
-            
-            self.summary_storage.save_summary(summary_record)
-            
-            # Marca como processado no banco
-            self.database.mark_as_processed(link)
-            
+            self._store_summary(post, summary)
             processed_count += 1
             logger.info(f"[{idx}/{len(posts)}] Resumo salvo com sucesso")
         
+        self.processed_buffer.flush()
+        
         logger.info(
             f"Processamento concluido - "
             f"Processados: {processed_count}, "
             f"Pulados: {skipped_count}"
         )
+        self._log_call_metrics()
         
         return posts
     
+    def process_queue(self, max_posts: Optional[int] = None) -> int:
+        """
+        Resume posts pendentes reservando-os na fila do banco.
+        
+        Vários workers (processos ou containers) podem rodar em paralelo
+        sobre o mesmo backlog: cada lote é reservado com lease, mantido por
+        heartbeat enquanto é resumido e liberado ao final, então nenhum post
+        gera chamadas duplicadas à OpenAI. Cada post é tentado no máximo uma
+        vez por execução; falhas voltam à fila após o backoff, e a execução
+        para se o circuito do modelo abrir.
+        
+        Args:
+            max_posts: Limite de posts a reservar nesta execução (sem limite se None)
+            
+        Returns:
+            Número de posts reservados e processados
+        """
+        worker_id = config.queue_worker_id
+        lease_seconds = config.queue_lease_seconds
+        claimed_total = 0
+        tried: Set[str] = set()
+        
+        while max_posts is None or claimed_total < max_posts:
+            limit = config.queue_claim_size
+            if max_posts is not None:
+                limit = min(limit, max_posts - claimed_total)
+            
+            if self.openai_client.is_circuit_open():
+                logger.warning(f"Worker {worker_id}: circuito aberto - encerrando a fila nesta execucao")
+                break
+            
+            posts = self.database.claim_posts(
+                worker_id, limit, lease_seconds, config.queue_max_errors,
+                config.queue_max_attempts, exclude=tried
+            )
+            if not posts:
+                break
+            
+            claimed_total += len(posts)
+            links = [post["link"] for post in posts]
+            tried.update(links)
+            logger.info(f"Worker {worker_id}: {len(posts)} posts reservados")
+            
+            try:
+                with LeaseHeartbeat(self.database, worker_id, links, lease_seconds):
+                    self.process_posts(posts)
+            finally:
+                # Sucessos já liberaram o lease ao avançar de estágio. Resumos que
+                # ainda não foram gravados (banco ocupado) mantêm o lease: o buffer
+                # tenta de novo e, gravado, o avanço de estágio o libera
+                unsaved = self.processed_buffer.pending_links()
+                if unsaved:
+                    logger.warning(f"Worker {worker_id}: {len(unsaved)} resumos aguardando gravacao - leases mantidos")
+                self.database.release_posts(worker_id, [link for link in links if link not in unsaved])
+        
+        logger.info(f"Worker {worker_id}: fila concluida ({claimed_total} posts reservados)")
+        return claimed_total
+    
+    def _summarize_in_batches(self, items: List[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        Resume posts curtos em chamadas empacotadas.
+        
+        Args:
+            items: Pares (link, conteúdo) dos posts pendentes
+            
+        Returns:
+            Dicionário link -> resumo dos posts resolvidos em lote
+        """
+        batches, singles = self.summary_generator.plan_batches(items)
+        if not batches:
+            return {}
+        
+        logger.info(
+            f"Modo empacotado: {sum(len(b) for b in batches)} posts em "
+            f"{len(batches)} chamadas, {len(singles)} pelo caminho individual"
+        )
+        
+        summaries: Dict[str, str] = {}
+        for batch in batches:
+            result = self.summary_generator.generate_batch(batch)
+            missing = len(batch) - len(result)
+            if missing:
+                logger.warning(f"Lote com {missing}/{len(batch)} itens invalidos - reprocessando individualmente")
+            summaries.update(result)
+        
+        return summaries
+    
+    def _store_summary(self, post: Post, summary: str) -> None:
+        """
+        Adiciona resumo ao post, persiste no banco e marca como processado.
+        
+        Args:
+            post: Post a atualizar
+            summary: Texto do resumo validado
+        """
+        link = post.get("link", "")
+        
+        # Adiciona resumo ao post
+        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M")
+        post["resumo"] = SummaryStorage.SEPARATOR + summary
+        post["data_resumo"] = timestamp
+        
+        # Resumo e marcação de processado vão juntos para o banco (em lote via buffer)
+        self.processed_buffer.add(link, post["resumo"], timestamp)
+    
+    def _log_call_metrics(self) -> None:
+        """Loga latência (TTFT e total), custo e escalonamentos das chamadas OpenAI."""
+        metrics = self.openai_client.get_metrics()
+        if not metrics["calls"]:
+            return
+        
+        message = (
+            f"Chamadas OpenAI: {metrics['calls']} "
+            f"(abortadas: {metrics['aborted']}) - "
+            f"latencia media {metrics['latency_avg']:.2f}s, "
+            f"maxima {metrics['latency_max']:.2f}s"
+        )
+        if "ttft_avg" in metrics:
+            message += f", TTFT medio {metrics['ttft_avg']:.2f}s"
+        message += f", custo estimado US$ {metrics['cost']:.4f}"
+        logger.info(message)
+        logger.info(
+            f"Cache de prompt: {metrics['cached_tokens']}/{metrics['prompt_tokens']} "
+            f"tokens de entrada ({metrics['cache_hit_ratio']:.0%}) - "
+            f"economia estimada US$ {metrics['cache_savings']:.4f}"
+        )
+        
+        for model, model_metrics in metrics["per_model"].items():
+            logger.info(
+                f"  - {model}: {model_metrics['calls']} chamadas, "
+                f"latencia media {model_metrics['latency_avg']:.2f}s, "
+                f"custo US$ {model_metrics['cost']:.4f}"
+            )
+        
+        cascade = self.summary_generator.cascade_stats
+        if cascade["attempts"]:
+            logger.info(
+                f"Cascata de modelos: {cascade['escalations']}/{cascade['attempts']} "
+                f"escalonados ({cascade['escalations'] / cascade['attempts']:.0%}), "
+                f"{cascade['fallbacks']} mantiveram o resumo do modelo barato"
+            )
+    
     def get_statistics(self) -> Dict:
         """
         Retorna estatísticas de processamento.
@@ -321,10 +1533,41 @@ class AIPostProcessor:
             Dicionário com estatísticas
         """
         db_stats = self.database.get_statistics()
-        storage_summaries = len(self.summary_storage.load_summaries())
         
         return {
             **db_stats,
-            'total_summaries_stored': storage_summaries
+            'total_summaries_stored': self.database.count_summaries()
         }
+    
+    def export_summaries_json(self, output_path: Path = None) -> bool:
+        """
+        Exporta resumos do banco no formato JSON legado (lista com indent=2).
+        
+        Args:
+            output_path: Arquivo de saída (usa output_summaries_json se não fornecido)
+            
+        Returns:
+            True se sucesso
+        """
+        output_path = Path(output_path or config.output_summaries_json)
+        try:
+            summaries = [
+                {
+                    "titulo": post["title"],
+                    "link": post["link"],
+                    "data": post["data_resumo"],
+                    "conteudo": post["resumo"].removeprefix(SummaryStorage.SEPARATOR)
+                }
+                for post in self.database.load_posts(stages=('summarized', 'delivered'))
+                if post["resumo"]
+            ]
+            with AtomicFile.open(output_path) as f:
+                json.dump(summaries, f, indent=2, ensure_ascii=False)
+            
+            logger.info(f"Exportados {len(summaries)} resumos para {output_path}")
+            return True
+            
+        except Exception as exc:
+            logger.error(f"Erro ao exportar resumos: {str(exc)}")
+            return False
 
@@ -0,0 +1,443 @@
+"""
+Módulo de Extração de Artigos
+==============================
+Extrai e condensa o texto dos posts para envio ao modelo de IA.
+
+O modelo de chat não acessa URLs: sem o conteúdo do artigo o prompt
+carrega apenas o link. Este módulo remove boilerplate do HTML, conta
+tokens e seleciona os parágrafos mais densos dentro de um orçamento.
+
+Author: Sistema AFN
+Date: 2025-12-09
+"""
+
+import hashlib
+import math
+import re
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+
+from src.config import config
+from src.logger import get_logger
+from src.utils import AtomicFile, HTTPSession
+
+try:
+    import tiktoken
+except ImportError:  # Dependência opcional: sem ela os tokens são estimados
+    tiktoken = None
+
+
+logger = get_logger(__name__)
+
+
+class TokenCounter:
+    """Contador de tokens (tiktoken quando disponível, estimativa caso contrário)."""
+    
+    def __init__(self, model: str = None):
+        """
+        Inicializa contador.
+        
+        Args:
+            model: Nome do modelo OpenAI (usa config se não fornecido)
+        """
+        # Mesma estimativa do orçamento de saída ([openai] chars_per_token)
+        self.chars_per_token = config.openai_chars_per_token
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model or config.openai_model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+    
+    def count(self, text: str) -> int:
+        """
+        Conta tokens do texto.
+        
+        Args:
+            text: Texto a medir
+            
+        Returns:
+            Número de tokens (exato ou estimado)
+        """
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return math.ceil(len(text) / self.chars_per_token)
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Corta texto para no máximo max_tokens tokens.
+        
+        Args:
+            text: Texto original
+            max_tokens: Limite de tokens
+            
+        Returns:
+            Texto truncado
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            return self.encoding.decode(tokens[:max_tokens])
+        return text[:int(max_tokens * self.chars_per_token)]
+
+
+class ArticleExtractor:
+    """Extrator do corpo de artigos a partir do HTML da página."""
+    
+    NOISE_TAGS = [
+        "script", "style", "noscript", "nav", "header", "footer",
+        "aside", "form", "svg", "button", "iframe"
+    ]
+    
+    BLOCK_TAGS = ["h1", "h2", "h3", "h4", "p", "li", "pre", "blockquote"]
+    
+    HEADING_TAGS = {"h1", "h2", "h3", "h4"}
+    
+    BOILERPLATE_PATTERNS = re.compile(
+        r"cookie|subscribe|newsletter|sign up|all rights reserved|privacy|"
+        r"terms of use|share this|try databricks|get started for free",
+        re.IGNORECASE
+    )
+    
+    MIN_PARAGRAPH_CHARS = 40
+    
+    # Parágrafos iniciais costumam trazer o problema abordado
+    LEAD_PARAGRAPHS = 2
+    
+    @classmethod
+    def extract_paragraphs(cls, html: str) -> List[str]:
+        """
+        Extrai blocos de texto relevantes do HTML, sem boilerplate.
+        
+        Args:
+            html: Código HTML da página
+            
+        Returns:
+            Lista de parágrafos na ordem do documento
+        """
+        if not html:
+            return []
+        
+        soup = BeautifulSoup(html, "html.parser")
+        for tag in soup(cls.NOISE_TAGS):
+            tag.decompose()
+        
+        root = cls._find_content_root(soup)
+        if root is None:
+            return []
+        
+        paragraphs: List[str] = []
+        seen = set()
+        
+        for element in root.find_all(cls.BLOCK_TAGS):
+            # Ignora contêineres (ex.: <li><p>...</p></li>) para não duplicar texto
+            if element.find(cls.BLOCK_TAGS):
+                continue
+            
+            text = " ".join(element.get_text(" ", strip=True).split())
+            if not text or text in seen:
+                continue
+            
+            is_heading = element.name in cls.HEADING_TAGS
+            if not is_heading and len(text) < cls.MIN_PARAGRAPH_CHARS:
+                continue
+            if len(text) < 200 and cls.BOILERPLATE_PATTERNS.search(text):
+                continue
+            
+            seen.add(text)
+            paragraphs.append(f"## {text}" if is_heading else text)
+        
+        return paragraphs
+    
+    @staticmethod
+    def _find_content_root(soup: BeautifulSoup):
+        """Escolhe o contêiner com mais texto em parágrafos (article/main/body)."""
+        candidates = soup.find_all(["article", "main"]) or []
+        if soup.body:
+            candidates.append(soup.body)
+        if not candidates:
+            return soup
+        
+        return max(
+            candidates,
+            key=lambda el: sum(len(p.get_text(strip=True)) for p in el.find_all("p"))
+        )
+    
+    @classmethod
+    def condense(cls, paragraphs: List[str], max_tokens: int, counter: TokenCounter) -> str:
+        """
+        Seleciona os parágrafos mais densos que cabem no orçamento de tokens.
+        
+        Os parágrafos escolhidos são mantidos na ordem original. Se nenhum
+        couber inteiro, o primeiro é truncado.
+        
+        Args:
+            paragraphs: Parágrafos extraídos
+            max_tokens: Orçamento de tokens
+            counter: Contador de tokens
+            
+        Returns:
+            Texto condensado
+        """
+        if not paragraphs:
+            return ""
+        
+        costs = [counter.count(p) + 1 for p in paragraphs]
+        if sum(costs) <= max_tokens:
+            return "\n\n".join(paragraphs)
+        
+        ranked = sorted(
+            range(len(paragraphs)),
+            key=lambda i: cls._density(paragraphs[i], costs[i], i),
+            reverse=True
+        )
+        
+        selected = []
+        remaining = max_tokens
+        for idx in ranked:
+            if costs[idx] <= remaining:
+                selected.append(idx)
+                remaining -= costs[idx]
+        
+        if not selected:
+            return counter.truncate(paragraphs[0], max_tokens)
+        
+        return "\n\n".join(paragraphs[i] for i in sorted(selected))
+    
+    @staticmethod
+    def split_chunks(paragraphs: List[str], chunk_tokens: int, counter: TokenCounter) -> List[str]:
+        """
+        Agrupa parágrafos consecutivos em trechos de até chunk_tokens tokens.
+        
+        Os limites seguem os parágrafos, de modo que editar um trecho do post
+        não altera o conteúdo (e o hash) dos demais.
+        
+        Args:
+            paragraphs: Parágrafos extraídos
+            chunk_tokens: Tamanho máximo de cada trecho
+            counter: Contador de tokens
+            
+        Returns:
+            Lista de trechos
+        """
+        chunks: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        
+        for paragraph in paragraphs:
+            cost = counter.count(paragraph) + 1
+            if cost > chunk_tokens:
+                paragraph = counter.truncate(paragraph, chunk_tokens)
+                cost = chunk_tokens
+            
+            if current and current_tokens + cost > chunk_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            
+            current.append(paragraph)
+            current_tokens += cost
+        
+        if current:
+            chunks.append("\n\n".join(current))
+        
+        return chunks
+    
+    @classmethod
+    def _density(cls, paragraph: str, cost: int, position: int) -> float:
+        """Termos distintos por token, com bônus para os parágrafos iniciais."""
+        terms = {w for w in re.findall(r"\w+", paragraph.lower()) if len(w) > 3}
+        score = len(terms) / max(cost, 1)
+        if position < cls.LEAD_PARAGRAPHS:
+            score *= 2
+        return score
+
+
+class ArticleCache:
+    """
+    Cache em disco do texto extraído dos artigos, por link.
+    
+    Entradas expiram após o TTL: um post editado volta a ser baixado e,
+    com o texto novo, os trechos do modo chunked ganham novos hashes.
+    """
+    
+    def __init__(self, cache_dir: Path = None, ttl_seconds: float = None):
+        """
+        Inicializa cache.
+        
+        Args:
+            cache_dir: Diretório do cache (usa config se não fornecido)
+            ttl_seconds: Validade de cada entrada (usa config se não fornecido)
+        """
+        self.cache_dir = Path(cache_dir or config.article_cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.article_cache_ttl_hours * 3600
+    
+    def _path_for(self, link: str) -> Path:
+        """Retorna arquivo de cache do link."""
+        digest = hashlib.sha1(link.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.txt"
+    
+    def load(self, link: str) -> Optional[List[str]]:
+        """
+        Carrega parágrafos do cache.
+        
+        Args:
+            link: URL do post
+            
+        Returns:
+            Lista de parágrafos ou None se ausente ou expirado
+        """
+        path = self._path_for(link)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                logger.debug(f"Cache de artigo expirado: {link}")
+                return None
+            return path.read_text(encoding="utf-8").split("\n\n")
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning(f"Erro ao ler cache de artigo {link}: {str(exc)}")
+            return None
+    
+    def save(self, link: str, paragraphs: List[str]) -> None:
+        """
+        Salva parágrafos no cache.
+        
+        Args:
+            link: URL do post
+            paragraphs: Parágrafos extraídos
+        """
+        if not paragraphs:
+            return
+        try:
+            with AtomicFile.open(self._path_for(link)) as f:
+                f.write("\n\n".join(paragraphs))
+        except OSError as exc:
+            logger.warning(f"Erro ao salvar cache de artigo {link}: {str(exc)}")
+
+
+class ArticleContentProvider:
+    """Fornece o texto condensado de um post, reutilizando HTML já baixado."""
+    
+    def __init__(self, cache: ArticleCache = None, counter: TokenCounter = None):
+        """
+        Inicializa provedor.
+        
+        Args:
+            cache: Cache de artigos (cria um se não fornecido)
+            counter: Contador de tokens (cria um se não fornecido)
+        """
+        self.cache = cache or ArticleCache()
+        self.counter = counter or TokenCounter()
+        self.max_tokens = config.article_max_input_tokens
+        self.timeout = config.article_fetch_timeout
+    
+    def store_html(self, link: str, html: str) -> None:
+        """
+        Extrai e guarda o artigo a partir de HTML já obtido (ex.: pelo scraper).
+        
+        Args:
+            link: URL do post
+            html: Código HTML da página
+        """
+        self.cache.save(link, ArticleExtractor.extract_paragraphs(html))
+    
+    def get_paragraphs(self, link: str) -> List[str]:
+        """
+        Retorna parágrafos do artigo, do cache ou baixando a página.
+        
+        Args:
+            link: URL do post
+            
+        Returns:
+            Lista de parágrafos (vazia se indisponível)
+        """
+        paragraphs = self.cache.load(link)
+        if paragraphs is not None:
+            return paragraphs
+        
+        try:
+            response = HTTPSession.get().get(
+                link,
+                timeout=self.timeout,
+                headers={"User-Agent": config.user_agent}
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as exc:
+            logger.warning(f"Erro ao baixar artigo {link}: {str(exc)}")
+            return []
+        
+        paragraphs = ArticleExtractor.extract_paragraphs(response.text)
+        self.cache.save(link, paragraphs)
+        return paragraphs
+    
+    def count_tokens(self, paragraphs: List[str]) -> int:
+        """
+        Conta tokens de uma lista de parágrafos.
+        
+        Args:
+            paragraphs: Parágrafos do artigo
+            
+        Returns:
+            Total de tokens
+        """
+        return sum(self.counter.count(p) + 1 for p in paragraphs)
+    
+    def condense(self, paragraphs: List[str], max_tokens: int = None) -> str:
+        """
+        Condensa parágrafos para o orçamento de tokens.
+        
+        Args:
+            paragraphs: Parágrafos do artigo
+            max_tokens: Orçamento de tokens (usa config se não fornecido)
+            
+        Returns:
+            Texto condensado
+        """
+        return ArticleExtractor.condense(paragraphs, max_tokens or self.max_tokens, self.counter)
+    
+    def split_chunks(self, paragraphs: List[str], chunk_tokens: int = None) -> List[str]:
+        """
+        Divide artigo em trechos para resumo map-reduce.
+        
+        Args:
+            paragraphs: Parágrafos do artigo
+            chunk_tokens: Tamanho dos trechos (usa config se não fornecido)
+            
+        Returns:
+            Lista de trechos
+        """
+        return ArticleExtractor.split_chunks(
+            paragraphs, chunk_tokens or config.article_chunk_tokens, self.counter
+        )
+    
+    def get_content(self, link: str, max_tokens: int = None) -> str:
+        """
+        Retorna texto do artigo condensado para o orçamento de tokens.
+        
+        Args:
+            link: URL do post
+            max_tokens: Orçamento de tokens (usa config se não fornecido)
+            
+        Returns:
+            Texto condensado (vazio se indisponível)
+        """
+        paragraphs = self.get_paragraphs(link)
+        if not paragraphs:
+            return ""
+        
+        content = self.condense(paragraphs, max_tokens)
+        logger.debug(
+            f"Artigo condensado: {self.counter.count(content)} tokens "
+            f"(orcamento {max_tokens or self.max_tokens}) - {link}"
+        )
+        return content
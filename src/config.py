@@ -9,6 +9,7 @@ Date: 2025-12-09
 """
 
 import os
+import socket
 import configparser
 from pathlib import Path
 from typing import Optional
@@ -77,13 +78,90 @@ class Config:
         
         # File paths
         self.output_posts_csv = config.get('files', 'output_posts_csv')
+        self.posts_backend = config.get('files', 'posts_backend', fallback='csv')
+        self.output_posts_parquet = config.get(
+            'files', 'output_posts_parquet',
+            fallback=str(Path(self.output_posts_csv).with_suffix('.parquet'))
+        )
         self.output_summaries_json = config.get('files', 'output_summaries_json')
+        self.output_summaries_jsonl = config.get(
+            'files', 'output_summaries_jsonl',
+            fallback=str(Path(self.output_summaries_json).with_suffix('.jsonl'))
+        )
         self.database_name = config.get('files', 'database_name')
+        self.export_on_finish = config.getboolean('files', 'export_on_finish', fallback=False)
+        
+        # Database configurations
+        self.db_journal_mode = config.get('database', 'journal_mode', fallback='WAL')
+        self.db_synchronous = config.get('database', 'synchronous', fallback='NORMAL')
+        self.db_cache_size_kb = config.getint('database', 'cache_size_kb', fallback=16384)
+        self.db_mmap_size_mb = config.getint('database', 'mmap_size_mb', fallback=128)
+        self.db_busy_timeout_ms = config.getint('database', 'busy_timeout_ms', fallback=5000)
+        self.db_cached_statements = config.getint('database', 'cached_statements', fallback=256)
+        self.db_write_buffer_size = config.getint('database', 'write_buffer_size', fallback=100)
+        self.db_write_buffer_interval = config.getfloat('database', 'write_buffer_interval_seconds', fallback=5.0)
+        
+        # Work queue configurations
+        self.queue_enabled = config.getboolean('queue', 'enabled', fallback=True)
+        self.queue_worker_id = (
+            config.get('queue', 'worker_id', fallback='')
+            or f"{socket.gethostname()}-{os.getpid()}"
+        )
+        self.queue_lease_seconds = config.getint('queue', 'lease_seconds', fallback=600)
+        self.queue_claim_size = config.getint('queue', 'claim_size', fallback=8)
+        self.queue_max_errors = config.getint('queue', 'max_errors', fallback=3)
+        self.queue_max_attempts = config.getint('queue', 'max_attempts', fallback=5)
+        self.queue_retry_backoff = config.getfloat('queue', 'retry_backoff_seconds', fallback=300)
         
         # OpenAI configurations
         self.openai_model = config.get('openai', 'model')
+        self.openai_cascade = config.getboolean('openai', 'cascade', fallback=False)
+        self.openai_escalation_model = config.get('openai', 'escalation_model', fallback='')
+        self.openai_circuit_failure_threshold = config.getint('openai', 'circuit_failure_threshold', fallback=3)
+        self.openai_circuit_cooldown = config.getint('openai', 'circuit_cooldown_seconds', fallback=300)
+        self.openai_model_prices = self._parse_model_prices(
+            config.get('openai', 'model_prices', fallback='')
+        )
+        self.openai_cached_input_discount = config.getfloat('openai', 'cached_input_discount', fallback=0.5)
         self.max_summary_chars = config.getint('openai', 'max_summary_chars')
         self.openai_timeout = config.getint('openai', 'timeout')
+        self.openai_chars_per_token = config.getfloat('openai', 'chars_per_token', fallback=3.5)
+        self.openai_structured_output = config.getboolean('openai', 'structured_output', fallback=True)
+        self.openai_local_trim_tolerance = config.getfloat('openai', 'local_trim_tolerance', fallback=0.2)
+        self.openai_min_summary_ratio = config.getfloat('openai', 'min_summary_ratio', fallback=0.04)
+        self.openai_max_calls_per_post = config.getint('openai', 'max_calls_per_post', fallback=2)
+        self.openai_stream = config.getboolean('openai', 'stream', fallback=False)
+        self.openai_stream_abort_margin = config.getint('openai', 'stream_abort_margin', fallback=300)
+        self.openai_batch_mode = config.getboolean('openai', 'batch_mode', fallback=False)
+        self.openai_batch_short_post_tokens = config.getint('openai', 'batch_short_post_tokens', fallback=1500)
+        self.openai_batch_max_input_tokens = config.getint('openai', 'batch_max_input_tokens', fallback=12000)
+        self.openai_batch_max_output_tokens = config.getint('openai', 'batch_max_output_tokens', fallback=16000)
+        self.openai_batch_max_posts = config.getint('openai', 'batch_max_posts', fallback=8)
+        
+        # Article extraction configurations
+        self.article_enabled = config.getboolean('article', 'enabled', fallback=True)
+        self.article_max_input_tokens = config.getint('article', 'max_input_tokens', fallback=3000)
+        self.article_fetch_timeout = config.getint('article', 'fetch_timeout', fallback=15)
+        self.article_cache_dir = config.get('article', 'cache_dir', fallback='dados/artigos')
+        self.article_cache_ttl_hours = config.getfloat('article', 'cache_ttl_hours', fallback=24)
+        self.article_chunked_mode = config.getboolean('article', 'chunked_mode', fallback=True)
+        self.article_chunked_threshold_tokens = config.getint('article', 'chunked_threshold_tokens', fallback=6000)
+        self.article_chunk_tokens = config.getint('article', 'chunk_tokens', fallback=2000)
+        self.article_chunk_workers = config.getint('article', 'chunk_workers', fallback=4)
+        
+        # Image cache configurations
+        self.image_cache_enabled = config.getboolean('images', 'cache_enabled', fallback=True)
+        self.image_cache_dir = config.get('images', 'cache_dir', fallback='dados/imagens')
+        self.image_cache_max_mb = config.getint('images', 'cache_max_mb', fallback=200)
+        self.image_cache_ttl_hours = config.getfloat('images', 'cache_ttl_hours', fallback=168)
+        self.image_download_timeout = config.getint('images', 'download_timeout', fallback=10)
+        self.image_download_workers = config.getint('images', 'download_workers', fallback=8)
+        self.image_batch_deadline = config.getfloat('images', 'batch_deadline_seconds', fallback=30)
+        
+        # HTTP session configurations
+        self.http_pool_size = config.getint('http', 'pool_size', fallback=16)
+        self.http_retries = config.getint('http', 'retries', fallback=2)
+        self.http_backoff_factor = config.getfloat('http', 'backoff_factor', fallback=0.5)
         
         # n8n configurations
         webhook_prod = config.get('n8n', 'webhook_url_production')
@@ -99,6 +177,26 @@ class Config:
         self.log_max_bytes = config.getint('logging', 'max_bytes')
         self.log_backup_count = config.getint('logging', 'backup_count')
     
+    @staticmethod
+    def _parse_model_prices(raw: str) -> dict:
+        """
+        Interpreta precos no formato "modelo:entrada/saida, ...".
+        
+        Args:
+            raw: Valor da opcao model_prices
+            
+        Returns:
+            Dicionario modelo -> (preco entrada, preco saida) por 1M de tokens
+        """
+        prices = {}
+        for item in raw.split(','):
+            if ':' not in item or '/' not in item:
+                continue
+            model, values = item.strip().rsplit(':', 1)
+            input_price, output_price = values.split('/', 1)
+            prices[model.strip()] = (float(input_price), float(output_price))
+        return prices
+    
     def _setup_paths(self) -> None:
         """Cria estrutura de diretórios necessária."""
         directories = [
@@ -7,12 +7,29 @@ Author: Sistema AFN
 Date: 2025-12-09
 """
 
+import csv
+import io
+import os
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 from src.config import config
 from src.logger import get_logger
+from src.models import Post, PostBatch
+from src.utils import AtomicFile
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Dependência opcional: sem ela apenas o backend CSV está disponível
+    pa = None
+    pc = None
+    ds = None
+    pq = None
 
 
 logger = get_logger(__name__)
@@ -21,6 +38,9 @@ logger = get_logger(__name__)
 class CSVHandler:
     """Gerenciador de operações com arquivos CSV."""
     
+    # Linhas por bloco nas leituras em streaming
+    READ_CHUNK_SIZE = 10_000
+    
     def __init__(self, csv_path: Path = None):
         """
         Inicializa handler CSV.
@@ -35,9 +55,124 @@ class CSVHandler:
         except Exception:
             # Se o path for relativo sem pai (ex.: "arquivo.csv"), parent é "." e não precisa mkdir.
             pass
+        # Índice de links do arquivo, invalidado quando o arquivo muda em disco
+        self._links: Optional[Set[str]] = None
+        self._links_signature: Optional[Tuple[int, int]] = None
         logger.info(f"CSVHandler inicializado: {self.csv_path}")
     
-    def load_posts(self) -> List[Dict[str, str]]:
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        """
+        Retorna assinatura (tamanho, mtime) do CSV para validar o índice.
+        
+        Returns:
+            Tupla (tamanho, mtime_ns) ou None se o arquivo não existe
+        """
+        if not self.csv_path.is_file():
+            return None
+        stat = self.csv_path.stat()
+        return stat.st_size, stat.st_mtime_ns
+    
+    def _get_link_index(self) -> Set[str]:
+        """
+        Retorna conjunto de links do CSV, lendo apenas a coluna link.
+        
+        O índice fica em memória e só é reconstruído se o arquivo foi
+        alterado por outro escritor.
+        
+        Returns:
+            Set com links presentes no arquivo
+        """
+        signature = self._file_signature()
+        if self._links is not None and signature == self._links_signature:
+            return self._links
+        
+        if signature is None:
+            self._links = set()
+        else:
+            links = pd.read_csv(self.csv_path, usecols=['link'], dtype=str, encoding='utf-8')['link']
+            self._links = set(links.dropna())
+        self._links_signature = signature
+        return self._links
+    
+    def _read_header(self) -> List[str]:
+        """
+        Lê apenas a linha de cabeçalho do CSV.
+        
+        Returns:
+            Lista de colunas (vazia se o arquivo não existe ou está vazio)
+        """
+        if not self.csv_path.is_file():
+            return []
+        with open(self.csv_path, 'r', encoding='utf-8', newline='') as f:
+            return next(csv.reader(f), [])
+    
+    def _append_rows(self, rows: List[Dict[str, str]], header: List[str]) -> None:
+        """
+        Acrescenta linhas ao final do CSV sem reler o arquivo.
+        
+        Args:
+            rows: Posts a acrescentar
+            header: Colunas do arquivo (cabeçalho escrito se o arquivo é novo)
+        """
+        write_header = not self.csv_path.is_file() or self.csv_path.stat().st_size == 0
+        buffer = io.StringIO()
+        # Mesmo terminador do pandas (_write_csv): o arquivo não mistura LF e CRLF
+        writer = csv.DictWriter(
+            buffer, fieldnames=header, restval='', extrasaction='ignore', lineterminator='\n'
+        )
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
+        
+        # Uma única escrita + fsync: append não passa pelo rename atômico
+        with open(self.csv_path, 'a', encoding='utf-8', newline='') as f:
+            f.write(buffer.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _write_csv(self, df: pd.DataFrame) -> None:
+        """
+        Substitui o CSV de forma atômica (leitores veem o arquivo anterior até o rename).
+        
+        Args:
+            df: Posts a gravar
+        """
+        with AtomicFile.temp_path(self.csv_path) as tmp_path:
+            df.to_csv(tmp_path, index=False, encoding='utf-8', lineterminator='\n')
+    
+    def _remember_links(self, links: List[str]) -> None:
+        """
+        Atualiza índice em memória após um append próprio.
+        
+        Args:
+            links: Links acrescentados
+        """
+        if self._links is not None:
+            self._links.update(links)
+        self._links_signature = self._file_signature()
+    
+    @staticmethod
+    def _merge_by_link(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Consolida linhas repetidas de um link em uma só.
+        
+        Para cada coluna vale o último valor não vazio, então uma atualização
+        parcial (campos em branco) não apaga os valores anteriores.
+        
+        Args:
+            df: Posts existentes seguidos das atualizações
+            
+        Returns:
+            DataFrame com uma linha por link, na ordem da primeira aparição
+        """
+        if 'link' not in df.columns or not df['link'].duplicated().any():
+            return df
+        
+        columns = list(df.columns)
+        merged = df.replace('', np.nan).groupby('link', sort=False, dropna=False).last()
+        return merged.reset_index()[columns]
+    
+    def load_posts(self) -> PostBatch:
         """
         Carrega posts do arquivo CSV.
         
@@ -64,12 +199,8 @@ class CSVHandler:
             if 'data_resumo' not in df.columns:
                 df['data_resumo'] = ''
 
-            # Normaliza NaN (float) para string vazia para evitar erros
-            # como: AttributeError: 'float' object has no attribute 'strip'
-            df['resumo'] = df['resumo'].fillna('').astype(str)
-            df['data_resumo'] = df['data_resumo'].fillna('').astype(str)
-            
-            posts = df.to_dict('records')
+            # Post normaliza NaN para string vazia em todos os campos
+            posts = PostBatch.from_dataframe(df)
             logger.info(f"Carregados {len(posts)} posts do CSV")
             
             return posts
@@ -133,7 +264,7 @@ class CSVHandler:
                     logger.info(f"Removidas {removed} duplicatas do CSV")
             
             # Salva CSV
-            df.to_csv(self.csv_path, index=False, encoding='utf-8')
+            self._write_csv(df)
             logger.info(f"Salvos {len(df)} posts no CSV: {self.csv_path}")
             
             return True
@@ -144,7 +275,11 @@ class CSVHandler:
     
     def append_post(self, post: Dict[str, str]) -> bool:
         """
-        Adiciona post ao CSV existente.
+        Adiciona post ao final do CSV em O(1), sem reler o arquivo.
+        
+        O cabeçalho é escrito só na criação do arquivo. Um link já presente
+        (ou colunas novas) segue por upsert_posts, então o arquivo nunca
+        guarda mais de uma linha por link.
         
         Args:
             post: Dicionário com dados do post
@@ -152,9 +287,25 @@ class CSVHandler:
         Returns:
             True se sucesso
         """
-        existing_posts = self.load_posts()
-        existing_posts.append(post)
-        return self.save_posts(existing_posts)
+        link = post.get('link')
+        if not link:
+            logger.warning("Post sem link - nao adicionado")
+            return False
+        
+        try:
+            known = self._get_link_index()
+            header = self._read_header() or list(post)
+            if link in known or set(post) - set(header):
+                # Atualização ou colunas novas exigem reescrever o arquivo
+                return self.upsert_posts([post])
+            
+            self._append_rows([post], header)
+            self._remember_links([link])
+            return True
+            
+        except Exception as exc:
+            logger.error(f"Erro ao adicionar post ao CSV: {str(exc)}")
+            return False
     
     def update_posts(self, posts: List[Dict[str, str]]) -> bool:
         """
@@ -166,47 +317,139 @@ class CSVHandler:
         Returns:
             True se sucesso
         """
-        existing_posts = self.load_posts()
+        return self.upsert_posts(posts)
+    
+    def upsert_posts(self, posts: List[Dict[str, str]]) -> bool:
+        """
+        Insere ou atualiza posts pelo link com uma única reescrita atômica.
         
-        # Cria mapa de links para índices
-        link_map = {post.get('link'): idx for idx, post in enumerate(existing_posts)}
+        O arquivo é lido uma vez e substituído por rename, sempre com uma
+        linha por link; se nenhum valor muda, não é reescrito. Campos vazios
+        não apagam valores já gravados.
         
-        # Atualiza posts existentes
-        updated_count = 0
-        for post in posts:
-            link = post.get('link')
-            if link in link_map:
-                idx = link_map[link]
-                existing_posts[idx].update(post)
-                updated_count += 1
-            else:
-                existing_posts.append(post)
-        
-        logger.info(f"Atualizados {updated_count} posts existentes")
+        Args:
+            posts: Lista de posts (completos ou parciais)
+            
+        Returns:
+            True se sucesso
+        """
+        if not posts:
+            return True
         
-        return self.save_posts(existing_posts)
+        try:
+            # Consolida entradas repetidas do mesmo link (última vence)
+            incoming: Dict[str, Dict[str, str]] = {}
+            for post in posts:
+                link = post.get('link')
+                if link:
+                    incoming.setdefault(link, {}).update(post)
+            
+            known = self._get_link_index()
+            new_posts = [post for link, post in incoming.items() if link not in known]
+            updates = [post for link, post in incoming.items() if link in known]
+            return self._rewrite_with(updates, new_posts)
+            
+        except Exception as exc:
+            logger.error(f"Erro ao atualizar CSV: {str(exc)}")
+            return False
     
-    def get_posts_without_summaries(self) -> List[Dict[str, str]]:
+    def _rewrite_with(self, updates: List[Dict[str, str]], new_posts: List[Dict[str, str]]) -> bool:
         """
-        Retorna posts que não possuem resumo.
+        Aplica atualizações e inserções lendo e reescrevendo o CSV uma vez.
+        
+        A reescrita é evitada quando nenhum valor muda de fato.
         
+        Args:
+            updates: Posts já presentes no arquivo
+            new_posts: Posts novos
+            
         Returns:
-            Lista de posts sem resumo
+            True se sucesso
         """
-        posts = self.load_posts()
+        if self.csv_path.is_file():
+            df = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False, encoding='utf-8')
+        else:
+            df = pd.DataFrame()
         
-        posts_without_summary = [
-            post for post in posts
-            if not post.get('resumo') or post.get('resumo').strip() == ''
-        ]
+        changed = bool(new_posts)
+        columns = list(df.columns)
+        if updates:
+            changes = pd.DataFrame(updates).fillna('').astype(str).replace('', np.nan)
+            changes = changes.drop_duplicates(subset=['link'], keep='last').set_index('link')
+            for col in changes.columns.difference(df.columns):
+                df[col] = ''
+                columns.append(col)
+                changed = True
+            
+            df = df.set_index('link')
+            before = df.loc[changes.index, changes.columns].copy()
+            df.update(changes)
+            after = df.loc[changes.index, changes.columns]
+            changed = changed or not before.equals(after)
+            df = df.reset_index()[columns]
+        
+        if not changed:
+            logger.info("CSV ja atualizado - nenhuma reescrita necessaria")
+            return True
+        
+        if new_posts:
+            df = pd.concat([df, pd.DataFrame(new_posts)], ignore_index=True)
         
+        for col in ['resumo', 'data_resumo']:
+            if col not in df.columns:
+                df[col] = ''
+        df = df.fillna('')
+        self._write_csv(df)
+        
+        self._links = set(df['link'])
+        self._links_signature = self._file_signature()
         logger.info(
-            f"Encontrados {len(posts_without_summary)} posts sem resumo "
-            f"de {len(posts)} totais"
+            f"CSV reescrito: {len(updates)} posts atualizados, "
+            f"{len(new_posts)} novos ({len(df)} no total)"
         )
+        return True
+    
+    def get_posts_without_summaries(self) -> PostBatch:
+        """
+        Retorna posts que não possuem resumo.
         
+        Returns:
+            Lista de posts sem resumo
+        """
+        posts_without_summary = list(self.iter_posts_without_summaries())
+        logger.info(f"Encontrados {len(posts_without_summary)} posts sem resumo")
         return posts_without_summary
     
+    def iter_posts_without_summaries(self, chunksize: int = None) -> Iterator[Post]:
+        """
+        Percorre o CSV em blocos e gera apenas os posts sem resumo.
+        
+        A memória fica limitada a um bloco, independente do tamanho do
+        arquivo.
+        
+        Args:
+            chunksize: Linhas por bloco (usa READ_CHUNK_SIZE se não fornecido)
+            
+        Yields:
+            Posts sem resumo
+        """
+        if not self.csv_path.is_file():
+            return
+        
+        chunks = pd.read_csv(
+            self.csv_path,
+            dtype=str,
+            keep_default_na=False,
+            encoding='utf-8',
+            chunksize=chunksize or self.READ_CHUNK_SIZE
+        )
+        for chunk in chunks:
+            for col in ['resumo', 'data_resumo']:
+                if col not in chunk.columns:
+                    chunk[col] = ''
+            
+            yield from PostBatch.from_dataframe(chunk[chunk['resumo'].str.strip() == ''])
+    
     def validate_csv_structure(self) -> bool:
         """
         Valida estrutura do CSV.
@@ -239,24 +482,324 @@ class CSVHandler:
         """
         Retorna estatísticas do CSV.
         
+        Lê apenas as colunas necessárias e conta com operações vetorizadas,
+        sem converter as linhas em dicionários.
+        
         Returns:
             Dicionário com estatísticas
         """
-        posts = self.load_posts()
+        if not self.csv_path.is_file():
+            return self._summarize_columns(pd.DataFrame(columns=['post_type', 'resumo']))
         
-        total = len(posts)
-        with_summary = sum(1 for p in posts if p.get('resumo'))
-        without_summary = total - with_summary
+        try:
+            header = self._read_header()
+            columns = [col for col in ['post_type', 'resumo'] if col in header]
+            df = pd.read_csv(
+                self.csv_path,
+                usecols=columns,
+                dtype=str,
+                keep_default_na=False,
+                encoding='utf-8'
+            )
+            return self._summarize_columns(df)
+            
+        except Exception as exc:
+            logger.error(f"Erro ao calcular estatisticas do CSV: {str(exc)}")
+            return self._summarize_columns(pd.DataFrame(columns=['post_type', 'resumo']))
+    
+    @staticmethod
+    def _summarize_columns(df: pd.DataFrame) -> Dict:
+        """
+        Calcula estatísticas a partir das colunas post_type e resumo.
+        
+        Args:
+            df: DataFrame com as colunas post_type e resumo (quando existirem)
+            
+        Returns:
+            Dicionário com estatísticas
+        """
+        total = len(df)
+        
+        with_summary = 0
+        if 'resumo' in df.columns:
+            resumo = df['resumo'].fillna('').astype(str).str.strip().to_numpy()
+            with_summary = int(np.count_nonzero(resumo != ''))
         
         post_types = {}
-        for post in posts:
-            post_type = post.get('post_type', 'Unknown')
-            post_types[post_type] = post_types.get(post_type, 0) + 1
+        if 'post_type' in df.columns:
+            types = df['post_type'].astype(str).replace({'': 'Unknown', 'nan': 'Unknown'})
+            post_types = {str(k): int(v) for k, v in types.value_counts(sort=False).items()}
         
         return {
             'total_posts': total,
             'posts_with_summary': with_summary,
-            'posts_without_summary': without_summary,
+            'posts_without_summary': total - with_summary,
             'post_types': post_types
         }
 
+
+class ParquetHandler(CSVHandler):
+    """
+    Backend colunar (Parquet) com a mesma API do CSVHandler.
+    
+    Leituras analíticas leem só as colunas necessárias (projeção) e o
+    filtro de posts sem resumo é aplicado na leitura (predicate pushdown
+    por row group). post_type é gravado com codificação de dicionário.
+    Arquivos Parquet são imutáveis: escritas regravam o arquivo inteiro,
+    então este backend favorece cargas dominadas por leitura.
+    """
+    
+    REQUIRED_COLUMNS = ['post_type', 'title', 'cover_image', 'link']
+    
+    def __init__(self, parquet_path: Path = None):
+        """
+        Inicializa handler Parquet.
+        
+        Args:
+            parquet_path: Caminho do arquivo Parquet (usa config se não fornecido)
+        """
+        if pq is None:
+            raise ImportError("pyarrow nao instalado - backend Parquet indisponivel")
+        # csv_path mantido como nome do atributo por compatibilidade da API
+        super().__init__(Path(parquet_path or config.output_posts_parquet))
+    
+    def _get_link_index(self) -> Set[str]:
+        """
+        Retorna conjunto de links do Parquet, lendo apenas a coluna link.
+        
+        Returns:
+            Set com links presentes no arquivo
+        """
+        signature = self._file_signature()
+        if self._links is not None and signature == self._links_signature:
+            return self._links
+        
+        links = self._read(columns=['link']).get('link', pd.Series(dtype=str))
+        self._links = set(links.dropna())
+        self._links_signature = signature
+        return self._links
+    
+    def _read_header(self) -> List[str]:
+        """
+        Lê apenas os nomes das colunas (schema do Parquet).
+        
+        Returns:
+            Lista de colunas (vazia se o arquivo não existe)
+        """
+        if not self.csv_path.is_file():
+            return []
+        return pq.read_schema(self.csv_path).names
+    
+    def _read(self, columns: List[str] = None, filters: List = None) -> pd.DataFrame:
+        """
+        Lê o arquivo Parquet com projeção de colunas e filtros opcionais.
+        
+        Args:
+            columns: Colunas a ler (todas se não fornecido)
+            filters: Filtros no formato do pyarrow (aplicados na leitura)
+            
+        Returns:
+            DataFrame com as linhas e colunas pedidas
+        """
+        if not self.csv_path.is_file():
+            return pd.DataFrame(columns=columns or [])
+        
+        if columns:
+            available = pq.read_schema(self.csv_path).names
+            columns = [col for col in columns if col in available]
+        
+        table = pq.read_table(self.csv_path, columns=columns, filters=filters)
+        df = table.to_pandas()
+        if 'post_type' in df.columns:
+            df['post_type'] = df['post_type'].astype(str)
+        return df
+    
+    def _write(self, df: pd.DataFrame) -> None:
+        """
+        Grava DataFrame em Parquet (substituição atômica do arquivo).
+        
+        Args:
+            df: Posts a gravar
+        """
+        df = df.fillna('').astype(str)
+        for col in ['resumo', 'data_resumo']:
+            if col not in df.columns:
+                df[col] = ''
+        if 'post_type' in df.columns:
+            df['post_type'] = df['post_type'].astype('category')
+        
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with AtomicFile.temp_path(self.csv_path) as tmp_path:
+            pq.write_table(table, tmp_path, compression='zstd')
+    
+    def load_posts(self) -> PostBatch:
+        """
+        Carrega posts do arquivo Parquet.
+        
+        Returns:
+            Lista de dicionários com posts
+        """
+        try:
+            posts = PostBatch.from_dataframe(self._read())
+            logger.info(f"Carregados {len(posts)} posts do Parquet")
+            return posts
+            
+        except Exception as exc:
+            logger.error(f"Erro ao carregar Parquet: {str(exc)}")
+            return []
+    
+    def save_posts(self, posts: List[Dict[str, str]], remove_duplicates: bool = True) -> bool:
+        """
+        Salva posts no arquivo Parquet, preservando resumos já existentes.
+        
+        Args:
+            posts: Lista de posts
+            remove_duplicates: Se deve remover duplicatas por link
+            
+        Returns:
+            True se sucesso
+        """
+        if not posts:
+            logger.warning("Nenhum post para salvar")
+            return False
+        
+        try:
+            df = pd.DataFrame(posts).fillna('').astype(str)
+            for col in ['resumo', 'data_resumo']:
+                if col not in df.columns:
+                    df[col] = ''
+            
+            # Preserva resumos já existentes quando o scraping roda novamente
+            existing = self._read(columns=['link', 'resumo', 'data_resumo'])
+            if 'link' in df.columns and 'link' in existing.columns:
+                existing = existing.drop_duplicates(subset=['link'], keep='last')
+                merged = df.merge(existing, on='link', how='left', suffixes=('', '_old'))
+                for col in ['resumo', 'data_resumo']:
+                    old = merged.pop(f'{col}_old').fillna('')
+                    merged[col] = merged[col].where(merged[col].str.strip() != '', old)
+                df = merged
+            
+            if remove_duplicates and 'link' in df.columns:
+                df = df.drop_duplicates(subset=['link'], keep='last')
+            
+            self._write(df)
+            logger.info(f"Salvos {len(df)} posts no Parquet: {self.csv_path}")
+            return True
+            
+        except Exception as exc:
+            logger.error(f"Erro ao salvar Parquet: {str(exc)}")
+            return False
+    
+    def upsert_posts(self, posts: List[Dict[str, str]]) -> bool:
+        """
+        Insere ou atualiza posts pelo link (regrava o arquivo uma vez).
+        
+        Args:
+            posts: Lista de posts (completos ou parciais)
+            
+        Returns:
+            True se sucesso
+        """
+        if not posts:
+            return True
+        
+        try:
+            incoming = pd.DataFrame(posts).fillna('').astype(str)
+            df = self._merge_by_link(pd.concat([self._read(), incoming], ignore_index=True))
+            self._write(df)
+            logger.info(f"Parquet atualizado: {len(incoming)} posts ({len(df)} no total)")
+            return True
+            
+        except Exception as exc:
+            logger.error(f"Erro ao atualizar Parquet: {str(exc)}")
+            return False
+    
+    def append_post(self, post: Dict[str, str]) -> bool:
+        """
+        Adiciona post ao Parquet (regrava o arquivo).
+        
+        Args:
+            post: Dicionário com dados do post
+            
+        Returns:
+            True se sucesso
+        """
+        return self.upsert_posts([post])
+    
+    def iter_posts_without_summaries(self, chunksize: int = None) -> Iterator[Post]:
+        """
+        Gera posts sem resumo em lotes, com o filtro aplicado na leitura.
+        
+        Args:
+            chunksize: Linhas por lote (usa READ_CHUNK_SIZE se não fornecido)
+            
+        Yields:
+            Posts sem resumo
+        """
+        if not self.csv_path.is_file():
+            return
+        
+        dataset = ds.dataset(self.csv_path, format='parquet')
+        # Mesmo critério do CSV: resumo só com espaços conta como ausente
+        batches = dataset.to_batches(
+            filter=pc.utf8_trim_whitespace(ds.field('resumo')) == '',
+            batch_size=chunksize or self.READ_CHUNK_SIZE
+        )
+        for batch in batches:
+            yield from PostBatch.from_dataframe(batch.to_pandas())
+    
+    def validate_csv_structure(self) -> bool:
+        """
+        Valida estrutura do arquivo lendo apenas o schema.
+        
+        Returns:
+            True se estrutura válida
+        """
+        if not self.csv_path.is_file():
+            return False
+        
+        try:
+            names = pq.read_schema(self.csv_path).names
+            missing = [col for col in self.REQUIRED_COLUMNS if col not in names]
+            if missing:
+                logger.error(f"Colunas faltando no Parquet: {missing}")
+                return False
+            
+            logger.info("Estrutura do Parquet validada com sucesso")
+            return True
+            
+        except Exception as exc:
+            logger.error(f"Erro ao validar estrutura do Parquet: {str(exc)}")
+            return False
+    
+    def get_statistics(self) -> Dict:
+        """
+        Retorna estatísticas lendo apenas as colunas post_type e resumo.
+        
+        Returns:
+            Dicionário com estatísticas
+        """
+        try:
+            return self._summarize_columns(self._read(columns=['post_type', 'resumo']))
+            
+        except Exception as exc:
+            logger.error(f"Erro ao calcular estatisticas do Parquet: {str(exc)}")
+            return self._summarize_columns(pd.DataFrame(columns=['post_type', 'resumo']))
+
+
+def create_posts_handler(backend: str = None) -> CSVHandler:
+    """
+    Cria handler de posts para o backend configurado.
+    
+    Args:
+        backend: 'csv' ou 'parquet' (usa config se não fornecido)
+        
+    Returns:
+        CSVHandler ou ParquetHandler (CSV se pyarrow não estiver instalado)
+    """
+    backend = (backend or config.posts_backend).lower()
+    if backend == 'parquet':
+        if pq is not None:
+            return ParquetHandler()
+        logger.warning("pyarrow nao instalado - usando backend CSV")
+    return CSVHandler()
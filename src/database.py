@@ -7,20 +7,179 @@ Author: Sistema AFN
 Date: 2025-12-09
 """
 
+import atexit
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from src.config import config
 from src.logger import get_logger
+from src.models import Post, PostBatch
 
 
 logger = get_logger(__name__)
 
 
+# Estágios do ciclo de vida de um post, em ordem
+POST_STAGES = ('discovered', 'enriched', 'summarized', 'delivered')
+
+# Estágios de posts que ainda precisam de resumo (reserváveis na fila)
+QUEUE_STAGES = ('discovered', 'enriched')
+
+# Migrações do schema: (versão, descrição, statements). Nunca altere uma
+# migração já publicada; adicione uma nova versão ao final.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "estrutura inicial (processados, chunk_summaries)", [
+        """
+        CREATE TABLE IF NOT EXISTS processados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            link TEXT UNIQUE NOT NULL,
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS chunk_summaries (
+            chunk_hash TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "remove idx_link redundante (UNIQUE ja cria indice)", [
+        "DROP INDEX IF EXISTS idx_link",
+    ]),
+    (3, "tabela posts com estado por estagio", [
+        """
+        CREATE TABLE posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            link TEXT UNIQUE NOT NULL,
+            stage TEXT NOT NULL DEFAULT 'discovered'
+                CHECK (stage IN ('discovered', 'enriched', 'summarized', 'delivered')),
+            discovered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            enriched_at TIMESTAMP,
+            summarized_at TIMESTAMP,
+            delivered_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+        """,
+        # "Próximos N posts no estágio X" percorre apenas o trecho do índice
+        "CREATE INDEX idx_posts_stage ON posts(stage, id)",
+        """
+        INSERT OR IGNORE INTO posts (link, stage, discovered_at, summarized_at)
+        SELECT link, 'summarized', created_at, processed_at FROM processados
+        """,
+    ]),
+    (4, "conteudo dos posts em posts (fonte unica de verdade)", [
+        "ALTER TABLE posts ADD COLUMN post_type TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE posts ADD COLUMN title TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE posts ADD COLUMN cover_image TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE posts ADD COLUMN resumo TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE posts ADD COLUMN data_resumo TEXT NOT NULL DEFAULT ''",
+    ]),
+    (5, "contadores mantidos por triggers e indice em processed_at", [
+        "CREATE INDEX idx_processados_processed_at ON processados(processed_at)",
+        """
+        CREATE TABLE stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO stats_counters (name, value)
+        SELECT 'total_processed', COUNT(*) FROM processados
+        UNION ALL SELECT 'total_posts', COUNT(*) FROM posts WHERE title != ''
+        UNION ALL SELECT 'posts_with_summary', COUNT(*) FROM posts WHERE title != '' AND resumo != ''
+        UNION ALL SELECT 'summaries', COUNT(*) FROM posts WHERE resumo != ''
+        """,
+        """
+        INSERT INTO stats_counters (name, value)
+        SELECT 'post_type:' || COALESCE(NULLIF(post_type, ''), 'Unknown'), COUNT(*)
+        FROM posts WHERE title != ''
+        GROUP BY COALESCE(NULLIF(post_type, ''), 'Unknown')
+        """,
+        """
+        CREATE TRIGGER trg_processados_insert AFTER INSERT ON processados
+        BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'total_processed';
+        END
+        """,
+        """
+        CREATE TRIGGER trg_processados_delete AFTER DELETE ON processados
+        BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'total_processed';
+        END
+        """,
+        """
+        CREATE TRIGGER trg_posts_insert AFTER INSERT ON posts
+        BEGIN
+            UPDATE stats_counters SET value = value + (NEW.title != '') WHERE name = 'total_posts';
+            UPDATE stats_counters SET value = value + (NEW.title != '' AND NEW.resumo != '')
+                WHERE name = 'posts_with_summary';
+            UPDATE stats_counters SET value = value + (NEW.resumo != '') WHERE name = 'summaries';
+            INSERT INTO stats_counters (name, value)
+                SELECT 'post_type:' || COALESCE(NULLIF(NEW.post_type, ''), 'Unknown'), 1
+                WHERE NEW.title != ''
+                ON CONFLICT(name) DO UPDATE SET value = value + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER trg_posts_update AFTER UPDATE OF title, resumo, post_type ON posts
+        BEGIN
+            UPDATE stats_counters SET value = value - (OLD.title != '') + (NEW.title != '')
+                WHERE name = 'total_posts';
+            UPDATE stats_counters
+                SET value = value - (OLD.title != '' AND OLD.resumo != '')
+                                  + (NEW.title != '' AND NEW.resumo != '')
+                WHERE name = 'posts_with_summary';
+            UPDATE stats_counters SET value = value - (OLD.resumo != '') + (NEW.resumo != '')
+                WHERE name = 'summaries';
+            UPDATE stats_counters SET value = value - 1
+                WHERE name = 'post_type:' || COALESCE(NULLIF(OLD.post_type, ''), 'Unknown')
+                AND OLD.title != '';
+            INSERT INTO stats_counters (name, value)
+                SELECT 'post_type:' || COALESCE(NULLIF(NEW.post_type, ''), 'Unknown'), 1
+                WHERE NEW.title != ''
+                ON CONFLICT(name) DO UPDATE SET value = value + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER trg_posts_delete AFTER DELETE ON posts
+        BEGIN
+            UPDATE stats_counters SET value = value - (OLD.title != '') WHERE name = 'total_posts';
+            UPDATE stats_counters SET value = value - (OLD.title != '' AND OLD.resumo != '')
+                WHERE name = 'posts_with_summary';
+            UPDATE stats_counters SET value = value - (OLD.resumo != '') WHERE name = 'summaries';
+            UPDATE stats_counters SET value = value - 1
+                WHERE name = 'post_type:' || COALESCE(NULLIF(OLD.post_type, ''), 'Unknown')
+                AND OLD.title != '';
+        END
+        """,
+    ]),
+    (6, "lease de trabalho em posts (fila para varios workers)", [
+        "ALTER TABLE posts ADD COLUMN lease_owner TEXT",
+        "ALTER TABLE posts ADD COLUMN lease_expires_at REAL",
+        "ALTER TABLE posts ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+    ]),
+    (7, "espera entre tentativas (backoff) na fila", [
+        "ALTER TABLE posts ADD COLUMN next_attempt_at REAL",
+    ]),
+]
+
+# Colunas de conteúdo de um post (mesmas colunas do CSV exportado)
+POST_FIELDS = Post.FIELDS
+
+
 class DatabaseManager:
     """Gerenciador de banco de dados SQLite."""
     
+    # Acima deste tamanho, consultas em lote usam tabela temporária em vez de IN
+    IN_BATCH_SIZE = 500
+    
     def __init__(self, db_path: Path = None):
         """
         Inicializa gerenciador de banco de dados.
@@ -29,49 +188,166 @@ class DatabaseManager:
             db_path: Caminho do banco de dados (usa config se não fornecido)
         """
         self.db_path = db_path or config.get_database_path()
+        # Uma conexão persistente por thread (pool mínimo e thread-safe)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
         self._ensure_database_exists()
         logger.info(f"DatabaseManager inicializado: {self.db_path}")
     
     def _ensure_database_exists(self) -> None:
-        """Garante que o banco de dados e tabelas existem."""
+        """Garante que o banco de dados existe e aplica migrações pendentes."""
         try:
             with self._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS processados (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        link TEXT UNIQUE NOT NULL,
-                        processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     );
                 """)
-                
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_link 
-                    ON processados(link);
-                """)
-                
                 conn.commit()
+                
+                applied = self._apply_migrations(conn)
+                if applied:
+                    logger.info(f"Migracoes aplicadas: {applied} - versao do schema: {self.get_schema_version()}")
                 logger.debug("Tabelas de banco de dados verificadas/criadas")
                 
         except sqlite3.Error as exc:
             logger.error(f"Erro ao criar estrutura do banco: {str(exc)}")
             raise
     
+    def _apply_migrations(self, conn: sqlite3.Connection) -> int:
+        """
+        Aplica, em ordem, as migrações com versão maior que a atual.
+        
+        Cada migração roda em uma transação BEGIN IMMEDIATE (serializa
+        processos concorrentes) e registra sua versão em schema_version.
+        
+        Args:
+            conn: Conexão SQLite
+            
+        Returns:
+            Número de migrações aplicadas
+        """
+        applied = 0
+        for version, description, statements in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = conn.execute(
+                    "SELECT COALESCE(MAX(version), 0) FROM schema_version"
+                ).fetchone()[0]
+                if version <= current:
+                    conn.rollback()
+                    continue
+                
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+                conn.commit()
+                applied += 1
+                logger.info(f"Migracao {version} aplicada: {description}")
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+        
+        return applied
+    
+    def get_schema_version(self) -> int:
+        """
+        Retorna versão atual do schema.
+        
+        Returns:
+            Maior versão de migração aplicada (0 se nenhuma)
+        """
+        with self._get_connection() as conn:
+            return conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM schema_version"
+            ).fetchone()[0]
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Abre conexão configurada com WAL e pragmas de desempenho.
+        
+        Returns:
+            Conexão SQLite
+        """
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=config.db_busy_timeout_ms / 1000,
+            cached_statements=config.db_cached_statements,
+            check_same_thread=False
+        )
+        # WAL permite leituras concorrentes enquanto um processo escreve
+        conn.execute(f"PRAGMA journal_mode={config.db_journal_mode}")
+        conn.execute(f"PRAGMA synchronous={config.db_synchronous}")
+        conn.execute(f"PRAGMA cache_size=-{config.db_cache_size_kb}")
+        conn.execute(f"PRAGMA mmap_size={config.db_mmap_size_mb * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={config.db_busy_timeout_ms}")
+        return conn
+    
     @contextmanager
     def _get_connection(self):
         """
         Context manager para conexões com banco de dados.
-        Garante fechamento adequado da conexão.
+        
+        Reutiliza a conexão persistente da thread atual (statements
+        preparados ficam em cache). Em caso de erro, desfaz a transação
+        aberta para não deixar a conexão em estado inconsistente.
         
         Yields:
             Conexão SQLite
         """
-        conn = sqlite3.connect(str(self.db_path))
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._pool_lock:
+                self._connections.append(conn)
+        
         try:
             yield conn
-        finally:
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+    
+    def close_thread_connection(self) -> None:
+        """
+        Fecha a conexão persistente da thread atual.
+        
+        Threads auxiliares (heartbeat, flush periódico) devem chamá-lo ao
+        terminar: a conexão de uma thread encerrada nunca é reutilizada e
+        só seria fechada em close().
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        
+        self._local.conn = None
+        with self._pool_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
             conn.close()
+        except sqlite3.Error as exc:
+            logger.warning(f"Erro ao fechar conexao: {str(exc)}")
+    
+    def close(self) -> None:
+        """Fecha todas as conexões persistentes (um checkpoint do WAL ocorre no fechamento)."""
+        with self._pool_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as exc:
+                    logger.warning(f"Erro ao fechar conexao: {str(exc)}")
+            self._connections.clear()
+        self._local = threading.local()
+        logger.debug("Conexoes do banco de dados encerradas")
     
     def mark_as_processed(self, link: str) -> bool:
         """
@@ -90,6 +366,7 @@ class DatabaseManager:
                     "INSERT OR IGNORE INTO processados (link) VALUES (?)",
                     (link,)
                 )
+                self._advance_rows(conn, [link], 'summarized')
                 conn.commit()
                 
                 was_inserted = cursor.rowcount > 0
@@ -102,6 +379,230 @@ class DatabaseManager:
             logger.error(f"Erro ao marcar link como processado: {str(exc)}")
             return False
     
+    def mark_many_as_processed(self, links: Iterable[str]) -> int:
+        """
+        Marca vários links como processados em uma única transação.
+        
+        Args:
+            links: URLs dos posts processados
+            
+        Returns:
+            Número de links efetivamente inseridos (ignora já existentes)
+        """
+        return self.save_summaries((link, '', '') for link in links) or 0
+    
+    def save_summaries(self, records: Iterable[Tuple[str, str, str]]) -> Optional[int]:
+        """
+        Grava resumos e marca os posts como processados em uma única transação.
+        
+        Resumo, marcação em processados e avanço para 'summarized' são
+        confirmados juntos (um commit e um fsync para todo o lote), então
+        uma queda nunca deixa as cópias divergentes. Resumo vazio não
+        sobrescreve o já armazenado.
+        
+        Args:
+            records: Tuplas (link, resumo, data_resumo)
+            
+        Returns:
+            Número de links efetivamente inseridos em processados, ou None se
+            a transação falhou (nada foi gravado; o chamador deve tentar de novo)
+        """
+        rows = list({link: (link, resumo, data) for link, resumo, data in records if link}.values())
+        if not rows:
+            return 0
+        
+        links = [row[0] for row in rows]
+        try:
+            with self._get_connection() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO posts (link, resumo, data_resumo) VALUES (?, ?, ?)
+                    ON CONFLICT(link) DO UPDATE SET
+                        resumo = COALESCE(NULLIF(excluded.resumo, ''), posts.resumo),
+                        data_resumo = COALESCE(NULLIF(excluded.data_resumo, ''), posts.data_resumo),
+                        updated_at = CURRENT_TIMESTAMP
+                    """,
+                    rows
+                )
+                # rowcount (e não total_changes): os triggers dos contadores
+                # também gravam e seriam somados
+                inserted = conn.executemany(
+                    "INSERT OR IGNORE INTO processados (link) VALUES (?)",
+                    ((link,) for link in links)
+                ).rowcount
+                self._advance_rows(conn, links, 'summarized')
+                conn.commit()
+                
+                logger.debug(f"Lote marcado como processado: {inserted}/{len(rows)} novos")
+                return inserted
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao marcar lote como processado: {str(exc)}")
+            return None
+    
+    def upsert_posts(self, posts: Iterable[Post]) -> int:
+        """
+        Insere ou atualiza posts extraídos em uma única transação.
+        
+        Posts novos entram no estágio 'discovered'. Campos vazios não
+        apagam dados já armazenados (um novo scraping preserva resumos).
+        
+        Args:
+            posts: Dicionários com as colunas de POST_FIELDS
+            
+        Returns:
+            Número de posts gravados
+        """
+        rows = list({
+            post['link']: tuple(str(post.get(field) or '') for field in POST_FIELDS)
+            for post in posts if post.get('link')
+        }.values())
+        if not rows:
+            return 0
+        
+        columns = ", ".join(POST_FIELDS)
+        placeholders = ", ".join("?" for _ in POST_FIELDS)
+        updates = ",\n".join(
+            f"{field} = COALESCE(NULLIF(excluded.{field}, ''), posts.{field})"
+            for field in POST_FIELDS if field != 'link'
+        )
+        try:
+            with self._get_connection() as conn:
+                conn.executemany(
+                    f"""
+                    INSERT INTO posts ({columns}) VALUES ({placeholders})
+                    ON CONFLICT(link) DO UPDATE SET
+                        {updates},
+                        updated_at = CURRENT_TIMESTAMP
+                    """,
+                    rows
+                )
+                conn.commit()
+                logger.info(f"Gravados {len(rows)} posts no banco")
+                return len(rows)
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao gravar posts: {str(exc)}")
+            return 0
+    
+    def load_posts(
+        self,
+        stages: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+        with_summary: bool = False,
+        max_errors: Optional[int] = None
+    ) -> PostBatch:
+        """
+        Carrega posts do banco, opcionalmente apenas de alguns estágios.
+        
+        Filtrar por estágio usa idx_posts_stage: cada fase lê só as linhas
+        que vai tocar em vez do acervo inteiro.
+        
+        Args:
+            stages: Estágios desejados (todos se não fornecido)
+            limit: Número máximo de posts
+            with_summary: Retorna apenas posts com resumo (filtro no SQL)
+            max_errors: Ignora posts com este número de falhas ou mais e os
+                que ainda aguardam nova tentativa (mesmo critério de claim_posts)
+            
+        Returns:
+            Posts em ordem de descoberta
+        """
+        conditions = []
+        params: List = []
+        if stages is not None:
+            stages = list(stages)
+            conditions.append(f"stage IN ({','.join('?' for _ in stages)})")
+            params.extend(stages)
+        if with_summary:
+            conditions.append("TRIM(resumo) != ''")
+        if max_errors is not None:
+            conditions.append("error_count < ?")
+            conditions.append("(next_attempt_at IS NULL OR next_attempt_at <= ?)")
+            params.extend([max_errors, time.time()])
+        
+        query = f"SELECT {', '.join(POST_FIELDS)} FROM posts"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.execute(query, params)
+                posts = PostBatch(Post(*row) for row in cursor.fetchall())
+                logger.debug(f"Carregados {len(posts)} posts do banco")
+                return posts
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao carregar posts: {str(exc)}")
+            return []
+    
+    def has_post_content(self) -> bool:
+        """
+        Verifica se a tabela posts já recebeu conteúdo (título) de algum post.
+        
+        Returns:
+            True se há ao menos um post com conteúdo
+        """
+        try:
+            with self._get_connection() as conn:
+                return conn.execute(
+                    "SELECT 1 FROM posts WHERE title != '' LIMIT 1"
+                ).fetchone() is not None
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao verificar conteudo dos posts: {str(exc)}")
+            return False
+    
+    def get_counters(self) -> Dict[str, int]:
+        """
+        Lê os contadores mantidos pelos triggers (custo constante).
+        
+        Returns:
+            Dicionário nome -> valor
+        """
+        try:
+            with self._get_connection() as conn:
+                return dict(conn.execute("SELECT name, value FROM stats_counters").fetchall())
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao ler contadores: {str(exc)}")
+            return {}
+    
+    def get_post_statistics(self) -> Dict:
+        """
+        Retorna estatísticas dos posts armazenados.
+        
+        Returns:
+            Dicionário com total, com/sem resumo e distribuição por tipo
+        """
+        counters = self.get_counters()
+        total = counters.get('total_posts', 0)
+        with_summary = counters.get('posts_with_summary', 0)
+        
+        return {
+            'total_posts': total,
+            'posts_with_summary': with_summary,
+            'posts_without_summary': total - with_summary,
+            'post_types': {
+                name.split(':', 1)[1]: value
+                for name, value in counters.items()
+                if name.startswith('post_type:') and value > 0
+            }
+        }
+    
+    def count_summaries(self) -> int:
+        """
+        Conta resumos armazenados.
+        
+        Returns:
+            Número de posts com resumo
+        """
+        return self.get_counters().get('summaries', 0)
+    
     def is_processed(self, link: str) -> bool:
         """
         Verifica se link já foi processado.
@@ -144,6 +645,59 @@ class DatabaseManager:
             logger.error(f"Erro ao recuperar links processados: {str(exc)}")
             return set()
     
+    def get_processed_among(self, links: Iterable[str]) -> Set[str]:
+        """
+        Retorna quais dos links informados já foram processados.
+        
+        Usa uma única conexão: listas pequenas são consultadas com IN em
+        lotes; listas grandes são carregadas em uma tabela temporária e
+        resolvidas com um único JOIN no índice de link.
+        
+        Args:
+            links: URLs a verificar
+            
+        Returns:
+            Subconjunto dos links já processados
+        """
+        candidates = list({link for link in links if link})
+        if not candidates:
+            return set()
+        
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                
+                if len(candidates) <= self.IN_BATCH_SIZE:
+                    placeholders = ",".join("?" for _ in candidates)
+                    cursor.execute(
+                        f"SELECT link FROM processados WHERE link IN ({placeholders})",
+                        candidates
+                    )
+                    return {row[0] for row in cursor.fetchall()}
+                
+                cursor.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS candidatos (link TEXT PRIMARY KEY)"
+                )
+                cursor.execute("DELETE FROM candidatos")
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO candidatos (link) VALUES (?)",
+                    ((link,) for link in candidates)
+                )
+                cursor.execute(
+                    """
+                    SELECT c.link FROM candidatos c
+                    JOIN processados p ON p.link = c.link
+                    """
+                )
+                processed = {row[0] for row in cursor.fetchall()}
+                cursor.execute("DELETE FROM candidatos")
+                conn.commit()
+                return processed
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao verificar links processados em lote: {str(exc)}")
+            return set()
+    
     def filter_unprocessed(self, links: List[str]) -> List[str]:
         """
         Filtra lista de links removendo os já processados.
@@ -154,7 +708,7 @@ class DatabaseManager:
         Returns:
             Lista apenas com URLs não processados
         """
-        processed = self.get_all_processed_links()
+        processed = self.get_processed_among(links)
         unprocessed = [link for link in links if link not in processed]
         
         logger.info(
@@ -165,6 +719,410 @@ class DatabaseManager:
         
         return unprocessed
     
+    def _advance_rows(self, conn: sqlite3.Connection, links: List[str], stage: str) -> None:
+        """
+        Avança posts para um estágio sem commit (usa a transação aberta).
+        
+        Só move para frente: posts já no estágio ou adiante não mudam.
+        Posts inexistentes são criados diretamente no estágio informado.
+        Ao avançar, o contador de erros é zerado (erros são do estágio atual);
+        ao sair dos estágios da fila, o lease do worker é liberado.
+        
+        Args:
+            conn: Conexão SQLite
+            links: URLs dos posts
+            stage: Estágio de destino (um de POST_STAGES)
+        """
+        if stage not in POST_STAGES:
+            raise ValueError(f"Estagio invalido: {stage}")
+        
+        earlier = POST_STAGES[:POST_STAGES.index(stage)]
+        if not earlier:
+            conn.executemany(
+                "INSERT OR IGNORE INTO posts (link) VALUES (?)",
+                ((link,) for link in links)
+            )
+            return
+        
+        stamp = f"{stage}_at"
+        placeholders = ",".join("?" for _ in earlier)
+        # Ao sair da fila o lease é liberado; dentro dela continua com o worker
+        release = "" if stage in QUEUE_STAGES else (
+            ",\n                lease_owner = NULL,\n                lease_expires_at = NULL"
+        )
+        conn.executemany(
+            f"""
+            INSERT INTO posts (link, stage, {stamp}) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(link) DO UPDATE SET
+                stage = excluded.stage,
+                {stamp} = excluded.{stamp},
+                updated_at = CURRENT_TIMESTAMP,
+                error_count = 0,
+                last_error = NULL,
+                next_attempt_at = NULL{release}
+            WHERE posts.stage IN ({placeholders})
+            """,
+            ((link, stage, *earlier) for link in links)
+        )
+    
+    def advance_stage(self, links: Iterable[str], stage: str) -> bool:
+        """
+        Avança posts para o estágio informado em uma única transação.
+        
+        Args:
+            links: URLs dos posts
+            stage: Estágio de destino (discovered, enriched, summarized, delivered)
+            
+        Returns:
+            True se sucesso
+        """
+        rows = [link for link in dict.fromkeys(links) if link]
+        if not rows:
+            return True
+        
+        try:
+            with self._get_connection() as conn:
+                self._advance_rows(conn, rows, stage)
+                conn.commit()
+                logger.debug(f"{len(rows)} posts avancados para '{stage}'")
+                return True
+                
+        except (sqlite3.Error, ValueError) as exc:
+            logger.error(f"Erro ao avancar posts para '{stage}': {str(exc)}")
+            return False
+    
+    def register_discovered(self, links: Iterable[str]) -> bool:
+        """
+        Registra links recém-descobertos pelo scraper.
+        
+        Args:
+            links: URLs encontradas
+            
+        Returns:
+            True se sucesso
+        """
+        return self.advance_stage(links, 'discovered')
+    
+    def record_stage_error(
+        self,
+        link: str,
+        error: str,
+        retry_after: float = None,
+        transient: bool = False
+    ) -> bool:
+        """
+        Registra falha no processamento do estágio atual de um post.
+        
+        O lease é liberado e o post só volta a ser reservado após a espera
+        (retry_after dobrado a cada erro já registrado). Falhas transitórias
+        (rede, circuito aberto) não contam para o limite de erros. Como a
+        falha tem desfecho registrado, attempts (reservas sem desfecho, ex.:
+        worker que caiu) é zerado.
+        
+        Args:
+            link: URL do post
+            error: Descrição do erro
+            retry_after: Espera base em segundos (usa config se não fornecido)
+            transient: Se a falha não deve contar para o limite de erros
+            
+        Returns:
+            True se sucesso
+        """
+        retry_after = config.queue_retry_backoff if retry_after is None else retry_after
+        increment = 0 if transient else 1
+        now = time.time()
+        try:
+            with self._get_connection() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO posts (link, error_count, last_error, next_attempt_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(link) DO UPDATE SET
+                        next_attempt_at = ? + ? * (1 << MIN(posts.error_count, 10)),
+                        error_count = posts.error_count + excluded.error_count,
+                        last_error = excluded.last_error,
+                        lease_owner = NULL,
+                        lease_expires_at = NULL,
+                        attempts = 0,
+                        updated_at = CURRENT_TIMESTAMP
+                    """,
+                    (link, increment, error, now + retry_after, now, retry_after)
+                )
+                conn.commit()
+                return True
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao registrar falha do post: {str(exc)}")
+            return False
+    
+    def get_posts_in_stage(
+        self,
+        stage: str,
+        limit: int = 100,
+        max_errors: Optional[int] = None
+    ) -> List[str]:
+        """
+        Retorna os próximos posts parados em um estágio, em ordem de descoberta.
+        
+        Resolvido por idx_posts_stage (stage, id): percorre o índice já na ordem
+        de descoberta e para ao atingir o limite, sem varrer a tabela.
+        
+        Args:
+            stage: Estágio procurado
+            limit: Número máximo de posts
+            max_errors: Ignora posts com este número de falhas ou mais e os
+                que ainda aguardam nova tentativa (next_attempt_at)
+            
+        Returns:
+            Lista de URLs
+        """
+        try:
+            with self._get_connection() as conn:
+                if max_errors is None:
+                    cursor = conn.execute(
+                        "SELECT link FROM posts WHERE stage = ? ORDER BY id LIMIT ?",
+                        (stage, limit)
+                    )
+                else:
+                    cursor = conn.execute(
+                        """
+                        SELECT link FROM posts
+                        WHERE stage = ? AND error_count < ?
+                        AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                        ORDER BY id LIMIT ?
+                        """,
+                        (stage, max_errors, time.time(), limit)
+                    )
+                return [row[0] for row in cursor.fetchall()]
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao buscar posts no estagio '{stage}': {str(exc)}")
+            return []
+    
+    def get_posts_needing_summary(self, limit: int = 100, max_errors: int = 3) -> List[str]:
+        """
+        Retorna os próximos N posts que ainda precisam de resumo.
+        
+        Args:
+            limit: Número máximo de posts
+            max_errors: Ignora posts que já falharam este número de vezes
+            
+        Returns:
+            Lista de URLs (posts enriquecidos primeiro, depois descobertos)
+        """
+        pending = self.get_posts_in_stage('enriched', limit, max_errors)
+        if len(pending) < limit:
+            pending += self.get_posts_in_stage('discovered', limit - len(pending), max_errors)
+        return pending
+    
+    def get_stage_counts(self) -> Dict[str, int]:
+        """
+        Conta posts por estágio.
+        
+        Returns:
+            Dicionário estágio -> quantidade
+        """
+        counts = dict.fromkeys(POST_STAGES, 0)
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.execute("SELECT stage, COUNT(*) FROM posts GROUP BY stage")
+                counts.update(dict(cursor.fetchall()))
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao contar posts por estagio: {str(exc)}")
+        return counts
+    
+    def claim_posts(
+        self,
+        worker_id: str,
+        limit: int,
+        lease_seconds: float,
+        max_errors: int,
+        max_attempts: int = None,
+        exclude: Iterable[str] = ()
+    ) -> PostBatch:
+        """
+        Reserva atomicamente os próximos posts que precisam de resumo.
+        
+        A seleção e a gravação do lease ocorrem na mesma transação
+        BEGIN IMMEDIATE, então dois workers nunca reservam o mesmo post.
+        Posts com lease expirado (worker que caiu) voltam a ser elegíveis,
+        até max_attempts reservas sem desfecho; posts que falharam esperam
+        next_attempt_at.
+        
+        Args:
+            worker_id: Identificador do worker
+            limit: Número máximo de posts
+            lease_seconds: Duração do lease
+            max_errors: Ignora posts que já falharam este número de vezes
+            max_attempts: Ignora posts reservados este número de vezes sem
+                desfecho (usa config se não fornecido)
+            exclude: Links que não devem ser reservados (ex.: já tentados
+                pelo worker nesta execução)
+            
+        Returns:
+            Posts reservados, em ordem de descoberta
+        """
+        max_attempts = max_attempts or config.queue_max_attempts
+        exclude = [link for link in exclude if link]
+        now = time.time()
+        try:
+            with self._get_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                excluded = ""
+                if exclude:
+                    conn.execute("CREATE TEMP TABLE IF NOT EXISTS excluidos (link TEXT PRIMARY KEY)")
+                    conn.execute("DELETE FROM excluidos")
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO excluidos (link) VALUES (?)",
+                        ((link,) for link in exclude)
+                    )
+                    excluded = "AND link NOT IN (SELECT link FROM excluidos)"
+                cursor = conn.execute(
+                    f"""
+                    SELECT {', '.join(POST_FIELDS)} FROM posts
+                    WHERE stage IN ({','.join('?' for _ in QUEUE_STAGES)})
+                    AND error_count < ?
+                    AND attempts < ?
+                    AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                    AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                    {excluded}
+                    ORDER BY id LIMIT ?
+                    """,
+                    (*QUEUE_STAGES, max_errors, max_attempts, now, now, limit)
+                )
+                posts = PostBatch(Post(*row) for row in cursor.fetchall())
+                if exclude:
+                    conn.execute("DELETE FROM excluidos")
+                conn.executemany(
+                    """
+                    UPDATE posts SET
+                        lease_owner = ?,
+                        lease_expires_at = ?,
+                        attempts = attempts + 1
+                    WHERE link = ?
+                    """,
+                    ((worker_id, now + lease_seconds, post['link']) for post in posts)
+                )
+                conn.commit()
+                
+                if posts:
+                    logger.debug(f"Worker {worker_id} reservou {len(posts)} posts")
+                return posts
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao reservar posts: {str(exc)}")
+            return []
+    
+    def renew_leases(self, worker_id: str, links: Iterable[str], lease_seconds: float) -> int:
+        """
+        Estende os leases ainda mantidos pelo worker (heartbeat).
+        
+        Args:
+            worker_id: Identificador do worker
+            links: URLs reservadas
+            lease_seconds: Nova duração a partir de agora
+            
+        Returns:
+            Número de leases renovados
+        """
+        expires_at = time.time() + lease_seconds
+        try:
+            with self._get_connection() as conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "UPDATE posts SET lease_expires_at = ? WHERE link = ? AND lease_owner = ?",
+                    ((expires_at, link, worker_id) for link in links)
+                )
+                conn.commit()
+                return conn.total_changes - before
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao renovar leases: {str(exc)}")
+            return 0
+    
+    def release_posts(self, worker_id: str, links: Iterable[str]) -> int:
+        """
+        Libera leases ainda mantidos pelo worker (posts voltam à fila).
+        
+        Args:
+            worker_id: Identificador do worker
+            links: URLs reservadas
+            
+        Returns:
+            Número de leases liberados
+        """
+        try:
+            with self._get_connection() as conn:
+                before = conn.total_changes
+                conn.executemany(
+                    """
+                    UPDATE posts SET lease_owner = NULL, lease_expires_at = NULL
+                    WHERE link = ? AND lease_owner = ?
+                    """,
+                    ((link, worker_id) for link in links)
+                )
+                conn.commit()
+                return conn.total_changes - before
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao liberar leases: {str(exc)}")
+            return 0
+    
+    def get_chunk_summaries(self, chunk_hashes: List[str]) -> Dict[str, str]:
+        """
+        Busca resumos parciais (map) já calculados para trechos de artigos.
+        
+        Args:
+            chunk_hashes: Hashes dos trechos
+            
+        Returns:
+            Dicionário hash -> resumo apenas para os trechos em cache
+        """
+        if not chunk_hashes:
+            return {}
+        
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                placeholders = ",".join("?" for _ in chunk_hashes)
+                cursor.execute(
+                    f"SELECT chunk_hash, summary FROM chunk_summaries "
+                    f"WHERE chunk_hash IN ({placeholders})",
+                    list(chunk_hashes)
+                )
+                return dict(cursor.fetchall())
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao buscar resumos de trechos: {str(exc)}")
+            return {}
+    
+    def save_chunk_summaries(self, summaries: Dict[str, str]) -> bool:
+        """
+        Salva resumos parciais de trechos em uma única transação.
+        
+        Args:
+            summaries: Dicionário hash -> resumo
+            
+        Returns:
+            True se sucesso
+        """
+        if not summaries:
+            return True
+        
+        try:
+            with self._get_connection() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO chunk_summaries (chunk_hash, summary) VALUES (?, ?)",
+                    list(summaries.items())
+                )
+                conn.commit()
+                logger.debug(f"Salvos {len(summaries)} resumos de trechos")
+                return True
+                
+        except sqlite3.Error as exc:
+            logger.error(f"Erro ao salvar resumos de trechos: {str(exc)}")
+            return False
+    
     def get_statistics(self) -> dict:
         """
         Retorna estatísticas do banco de dados.
@@ -176,13 +1134,17 @@ class DatabaseManager:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("SELECT COUNT(*) FROM processados")
-                total = cursor.fetchone()[0]
+                cursor.execute(
+                    "SELECT value FROM stats_counters WHERE name = 'total_processed'"
+                )
+                row = cursor.fetchone()
+                total = row[0] if row else 0
                 
+                # Intervalo no índice de processed_at (DATE() na coluna forçaria varredura)
                 cursor.execute(
                     """
-                    SELECT COUNT(*) FROM processados 
-                    WHERE DATE(processed_at) = DATE('now')
+                    SELECT COUNT(*) FROM processados
+                    WHERE processed_at >= DATE('now') AND processed_at < DATE('now', '+1 day')
                     """
                 )
                 today = cursor.fetchone()[0]
@@ -196,3 +1158,171 @@ class DatabaseManager:
             logger.error(f"Erro ao obter estatísticas: {str(exc)}")
             return {'total_processed': 0, 'processed_today': 0}
 
+
+
+class ProcessedWriteBuffer:
+    """
+    Buffer write-behind para resumos e marcações de links processados.
+    
+    Acumula registros de vários workers e grava em lote com
+    save_summaries quando atinge o tamanho máximo, quando o intervalo
+    expira (thread em segundo plano) ou no encerramento.
+    """
+    
+    def __init__(
+        self,
+        database: DatabaseManager,
+        max_size: int = None,
+        flush_interval: float = None
+    ):
+        """
+        Inicializa buffer.
+        
+        Args:
+            database: Gerenciador de banco de dados
+            max_size: Links acumulados que disparam flush (usa config se não fornecido)
+            flush_interval: Segundos entre flushes periódicos (usa config se não fornecido)
+        """
+        self.database = database
+        self.max_size = max_size or config.db_write_buffer_size
+        self.flush_interval = flush_interval or config.db_write_buffer_interval
+        self._pending: List[Tuple[str, str, str]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            name="processed-write-buffer",
+            daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+    
+    def add(self, link: str, resumo: str = '', data_resumo: str = '') -> None:
+        """
+        Enfileira resumo do post e sua marcação como processado.
+        
+        Args:
+            link: URL do post processado
+            resumo: Resumo a gravar (vazio apenas marca como processado)
+            data_resumo: Data de geração do resumo
+        """
+        with self._lock:
+            self._pending.append((link, resumo, data_resumo))
+            should_flush = len(self._pending) >= self.max_size
+        
+        if should_flush:
+            self.flush()
+    
+    def flush(self) -> int:
+        """
+        Grava registros pendentes em uma única transação.
+        
+        Returns:
+            Número de links inseridos (0 se a gravação falhou; os registros
+            continuam pendentes)
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        
+        if not pending:
+            return 0
+        
+        inserted = self.database.save_summaries(pending)
+        if inserted is None:
+            # Banco ocupado/bloqueado: devolve ao buffer para a próxima tentativa
+            with self._lock:
+                self._pending[:0] = pending
+            logger.warning(f"Falha ao gravar {len(pending)} resumos - mantidos no buffer para nova tentativa")
+            return 0
+        
+        logger.debug(f"Buffer de processados descarregado: {len(pending)} links")
+        return inserted
+    
+    def pending_links(self) -> Set[str]:
+        """
+        Retorna links com resumo ainda não gravado no banco.
+        
+        Returns:
+            Conjunto de URLs pendentes
+        """
+        with self._lock:
+            return {link for link, _, _ in self._pending}
+    
+    def _flush_periodically(self) -> None:
+        """Descarrega o buffer a cada flush_interval segundos."""
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+        finally:
+            self.database.close_thread_connection()
+    
+    def close(self) -> None:
+        """Para a thread de flush e grava o que estiver pendente."""
+        if not self._stop.is_set():
+            self._stop.set()
+            self._flusher.join(timeout=self.flush_interval)
+        self.flush()
+    
+    def __enter__(self) -> 'ProcessedWriteBuffer':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class LeaseHeartbeat:
+    """
+    Renova em segundo plano os leases de posts reservados por um worker.
+    
+    Enquanto o lote é resumido, estende os leases a cada terço da duração;
+    se o processo cair, os leases expiram e outro worker retoma os posts.
+    """
+    
+    def __init__(
+        self,
+        database: DatabaseManager,
+        worker_id: str,
+        links: List[str],
+        lease_seconds: float
+    ):
+        """
+        Inicializa e inicia o heartbeat.
+        
+        Args:
+            database: Gerenciador de banco de dados
+            worker_id: Identificador do worker
+            links: URLs reservadas
+            lease_seconds: Duração do lease
+        """
+        self.database = database
+        self.worker_id = worker_id
+        self.links = list(links)
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._beat,
+            name="lease-heartbeat",
+            daemon=True
+        )
+        self._thread.start()
+    
+    def _beat(self) -> None:
+        """Renova os leases até ser interrompido."""
+        try:
+            while not self._stop.wait(self.lease_seconds / 3):
+                renewed = self.database.renew_leases(self.worker_id, self.links, self.lease_seconds)
+                logger.debug(f"Heartbeat: {renewed} leases renovados")
+        finally:
+            # Um heartbeat por lote: sem isso cada lote deixaria uma conexão aberta
+            self.database.close_thread_connection()
+    
+    def stop(self) -> None:
+        """Interrompe o heartbeat."""
+        self._stop.set()
+        self._thread.join(timeout=self.lease_seconds / 3)
+    
+    def __enter__(self) -> 'LeaseHeartbeat':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
@@ -0,0 +1,288 @@
+"""
+Módulo de Cache de Imagens
+==========================
+Cache persistente em disco das imagens de capa enviadas ao n8n.
+
+Cada entrega ao n8n baixava novamente a capa de todos os posts. O cache
+guarda o conteúdo uma vez por hash (capas repetidas ocupam um único
+arquivo), indexa URL -> hash/ETag em SQLite, revalida com If-None-Match
+apenas depois do TTL e respeita um orçamento de disco com remoção LRU.
+
+Author: Sistema AFN
+Date: 2025-12-09
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+
+from src.config import config
+from src.logger import get_logger
+from src.utils import AtomicFile, HTTPSession
+
+
+logger = get_logger(__name__)
+
+
+class ImageCache:
+    """Cache de imagens por URL (índice SQLite) e por hash do conteúdo (arquivos)."""
+    
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS images (
+            url TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_images_hash ON images(content_hash)",
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            content_hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_blobs_last_access ON blobs(last_access)",
+    )
+    
+    def __init__(
+        self,
+        cache_dir: Path = None,
+        max_bytes: int = None,
+        ttl_seconds: float = None,
+        timeout: int = None
+    ):
+        """
+        Inicializa cache.
+        
+        Args:
+            cache_dir: Diretório do cache (usa config se não fornecido)
+            max_bytes: Orçamento de disco para as imagens
+            ttl_seconds: Tempo em que uma imagem é servida sem revalidar
+            timeout: Timeout dos downloads em segundos
+        """
+        self.cache_dir = Path(cache_dir or config.image_cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else config.image_cache_max_mb * 1024 * 1024
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.image_cache_ttl_hours * 3600
+        self.timeout = timeout or config.image_download_timeout
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.cache_dir / "index.db", timeout=30, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            for statement in self.SCHEMA:
+                self._conn.execute(statement)
+        
+        self.metrics: Dict[str, int] = {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "stale_served": 0,
+            "errors": 0,
+            "evicted": 0,
+        }
+    
+    def _blob_path(self, content_hash: str) -> Path:
+        """Retorna arquivo do conteúdo (subdiretório pelos 2 primeiros caracteres)."""
+        return self.cache_dir / content_hash[:2] / f"{content_hash}.bin"
+    
+    def _count(self, metric: str) -> None:
+        """Incrementa métrica."""
+        with self._lock:
+            self.metrics[metric] += 1
+    
+    def get(self, url: str) -> Optional[bytes]:
+        """
+        Retorna imagem do cache, baixando ou revalidando quando necessário.
+        
+        Dentro do TTL a imagem é servida sem acesso à rede. Depois dele é
+        feita uma requisição condicional (ETag/Last-Modified); se a rede
+        falhar, a cópia antiga é servida.
+        
+        Args:
+            url: URL da imagem
+            
+        Returns:
+            Bytes da imagem ou None se indisponível
+        """
+        if not url:
+            return None
+        
+        entry = self._lookup(url)
+        cached = self._read_blob(entry["content_hash"]) if entry else None
+        
+        if cached is not None and time.time() - entry["fetched_at"] < self.ttl_seconds:
+            self._count("hits")
+            self._touch(url, entry["content_hash"], refreshed=False)
+            return cached
+        
+        headers = {}
+        if cached is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        
+        try:
+            response = HTTPSession.get_images().get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached is not None:
+                self._count("revalidated")
+                self._touch(url, entry["content_hash"], refreshed=True)
+                logger.debug(f"Imagem revalidada (304): {url}")
+                return cached
+            response.raise_for_status()
+        
+        except requests.exceptions.RequestException as exc:
+            if cached is not None:
+                self._count("stale_served")
+                logger.warning(f"Erro ao revalidar imagem {url}, usando copia em cache: {str(exc)}")
+                return cached
+            self._count("errors")
+            logger.warning(f"Erro ao baixar imagem {url}: {str(exc)}")
+            return None
+        
+        self._count("misses")
+        content = response.content
+        self._store(url, content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        logger.debug(f"Imagem baixada e armazenada em cache: {url}")
+        return content
+    
+    def _lookup(self, url: str) -> Optional[Dict]:
+        """Busca entrada do índice para a URL."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, etag, last_modified, fetched_at FROM images WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("content_hash", "etag", "last_modified", "fetched_at"), row))
+    
+    def _read_blob(self, content_hash: str) -> Optional[bytes]:
+        """Lê conteúdo do disco (None se o arquivo foi removido)."""
+        try:
+            return self._blob_path(content_hash).read_bytes()
+        except OSError:
+            return None
+    
+    def _touch(self, url: str, content_hash: str, refreshed: bool) -> None:
+        """Atualiza último acesso (LRU) e, após revalidação, o início do TTL."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE blobs SET last_access = ? WHERE content_hash = ?", (now, content_hash)
+            )
+            if refreshed:
+                self._conn.execute("UPDATE images SET fetched_at = ? WHERE url = ?", (now, url))
+    
+    def _store(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """
+        Grava conteúdo (uma vez por hash) e registra URL no índice.
+        
+        Args:
+            url: URL da imagem
+            content: Bytes baixados
+            etag: Cabeçalho ETag da resposta
+            last_modified: Cabeçalho Last-Modified da resposta
+        """
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(content_hash)
+        try:
+            if not path.exists():
+                with AtomicFile.open(path, 'wb') as f:
+                    f.write(content)
+            
+            now = time.time()
+            with self._lock, self._conn:
+                self._conn.execute(
+                    """
+                    INSERT INTO blobs (content_hash, size, last_access) VALUES (?, ?, ?)
+                    ON CONFLICT(content_hash) DO UPDATE SET last_access = excluded.last_access
+                    """,
+                    (content_hash, len(content), now)
+                )
+                self._conn.execute(
+                    """
+                    INSERT INTO images (url, content_hash, etag, last_modified, fetched_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        content_hash = excluded.content_hash,
+                        etag = excluded.etag,
+                        last_modified = excluded.last_modified,
+                        fetched_at = excluded.fetched_at
+                    """,
+                    (url, content_hash, etag, last_modified, now)
+                )
+            self._evict()
+        
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning(f"Erro ao gravar imagem em cache {url}: {str(exc)}")
+    
+    def _evict(self) -> None:
+        """Remove conteúdos menos usados recentemente até caber no orçamento."""
+        with self._lock, self._conn:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            
+            evicted = []
+            for content_hash, size in self._conn.execute(
+                "SELECT content_hash, size FROM blobs ORDER BY last_access"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                evicted.append(content_hash)
+                total -= size
+            
+            for content_hash in evicted:
+                self._conn.execute("DELETE FROM images WHERE content_hash = ?", (content_hash,))
+                self._conn.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+                self._blob_path(content_hash).unlink(missing_ok=True)
+            self.metrics["evicted"] += len(evicted)
+        
+        logger.debug(f"Cache de imagens: {len(evicted)} arquivos removidos (LRU)")
+    
+    def get_metrics(self) -> Dict:
+        """
+        Retorna métricas de uso do cache.
+        
+        Returns:
+            Contadores, taxa de acerto (sem acesso à rede) e ocupação em disco
+        """
+        with self._lock:
+            metrics = dict(self.metrics)
+            files, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+        
+        lookups = sum(metrics[key] for key in ("hits", "revalidated", "misses", "stale_served", "errors"))
+        metrics["hit_rate"] = metrics["hits"] / lookups if lookups else 0.0
+        metrics["files"] = files
+        metrics["size_mb"] = size / 1024 / 1024
+        return metrics
+    
+    def log_metrics(self) -> None:
+        """Registra métricas do cache no log."""
+        metrics = self.get_metrics()
+        logger.info(
+            f"Cache de imagens: {metrics['hits']} hits, {metrics['revalidated']} revalidadas, "
+            f"{metrics['misses']} downloads, {metrics['errors']} erros "
+            f"(taxa de acerto {metrics['hit_rate']:.0%}, {metrics['files']} arquivos, "
+            f"{metrics['size_mb']:.1f} MB)"
+        )
+    
+    def close(self) -> None:
+        """Fecha índice do cache."""
+        with self._lock:
+            self._conn.close()
@@ -15,9 +15,10 @@ from typing import Optional
 from src.config import config
 from src.logger import get_logger, LoggerFactory
 from src.scraper import DatabricksScraper
-from src.csv_handler import CSVHandler
-from src.ai_processor import AIPostProcessor
+from src.csv_handler import CSVHandler, create_posts_handler
+from src.ai_processor import AIPostProcessor, SummaryStorage
 from src.n8n_integration import N8NIntegration
+from src.database import QUEUE_STAGES
 
 
 logger = get_logger(__name__)
@@ -29,15 +30,60 @@ class Application:
     def __init__(self):
         """Inicializa aplicação."""
         self.scraper: Optional[DatabricksScraper] = None
-        self.csv_handler = CSVHandler()
+        self.csv_handler: CSVHandler = create_posts_handler()
         self.ai_processor = AIPostProcessor()
+        self.database = self.ai_processor.database
         self.n8n_integration = N8NIntegration()
+        self._import_legacy_files()
         
         logger.info("=" * 70)
         logger.info("Databricks Post Processor - Sistema Iniciado")
         logger.info(f"Ambiente: {config.environment}")
         logger.info("=" * 70)
     
+    def _import_legacy_files(self) -> None:
+        """
+        Importa CSV e resumos de versões anteriores para o banco (apenas uma vez).
+        
+        O banco passou a ser a fonte de verdade; enquanto a tabela posts não
+        tiver conteúdo, os arquivos existentes são carregados nela.
+        """
+        if self.database.has_post_content():
+            return
+        
+        legacy_csv = CSVHandler()
+        posts = legacy_csv.load_posts() if legacy_csv.csv_path.is_file() else []
+        
+        # JSON legado e depois o JSONL que o substituiu (o registro mais
+        # recente de cada link vence); os arquivos não são alterados
+        summaries = []
+        for path in (config.output_summaries_json, config.output_summaries_jsonl):
+            summaries += SummaryStorage(Path(path)).load_summaries()
+        
+        if not posts and not summaries:
+            return
+        
+        self.database.upsert_posts(posts)
+        self.database.upsert_posts(
+            {'link': record.get('link'), 'title': record.get('titulo', '')}
+            for record in summaries
+        )
+        
+        records = [
+            (post['link'], post['resumo'], post['data_resumo'])
+            for post in posts if post.get('link') and post.get('resumo', '').strip()
+        ]
+        records += [
+            (record['link'], SummaryStorage.SEPARATOR + record.get('conteudo', ''), record.get('data', ''))
+            for record in summaries if record.get('link') and record.get('conteudo')
+        ]
+        self.database.save_summaries(records)
+        
+        logger.info(
+            f"Importados para o banco: {len(posts)} posts do CSV, "
+            f"{len(summaries)} resumos do armazenamento legado"
+        )
+    
     def run_scraping(self) -> bool:
         """
         Executa fase de scraping de posts.
@@ -56,14 +102,14 @@ class Application:
                 LoggerFactory.log_operation_end(logger, "Scraping de Posts", False)
                 return False
             
-            # Salva posts no CSV
-            success = self.csv_handler.save_posts(posts)
+            # Grava posts no banco (novos entram como 'discovered')
+            success = self.database.upsert_posts(posts) > 0
             
             if success:
                 logger.info(f"Scraping concluido: {len(posts)} posts salvos")
                 LoggerFactory.log_operation_end(logger, "Scraping de Posts", True)
             else:
-                logger.error("Falha ao salvar posts no CSV")
+                logger.error("Falha ao gravar posts no banco")
                 LoggerFactory.log_operation_end(logger, "Scraping de Posts", False)
             
             return success
@@ -87,32 +133,31 @@ class Application:
         LoggerFactory.log_operation_start(logger, "Processamento com IA")
         
         try:
-            # Carrega posts do CSV
-            posts = self.csv_handler.load_posts()
-            
-            if not posts:
-                logger.warning("Nenhum post encontrado no CSV")
-                LoggerFactory.log_operation_end(logger, "Processamento com IA", False)
-                return False
-            
-            # Processa posts com IA
-            processed_posts = self.ai_processor.process_posts(posts)
-            
-            # Atualiza CSV com resumos
-            success = self.csv_handler.update_posts(processed_posts)
-            
-            if success:
-                stats = self.ai_processor.get_statistics()
-                logger.info(
-                    f"Processamento IA concluido - "
-                    f"Total processados: {stats.get('total_processed', 0)}"
-                )
-                LoggerFactory.log_operation_end(logger, "Processamento com IA", True)
+            if config.queue_enabled:
+                # Reserva lotes na fila do banco (seguro com vários workers)
+                self.ai_processor.process_queue()
             else:
-                logger.error("Falha ao atualizar CSV com resumos")
-                LoggerFactory.log_operation_end(logger, "Processamento com IA", False)
+                # Carrega apenas posts sem resumo que ainda podem ser tentados
+                # (mesmos limites de falhas e espera da fila)
+                posts = self.database.load_posts(
+                    stages=QUEUE_STAGES, max_errors=config.queue_max_errors
+                )
+                
+                if not posts:
+                    logger.info("Nenhum post pendente de resumo")
+                    LoggerFactory.log_operation_end(logger, "Processamento com IA", True)
+                    return True
+                
+                # Processa posts com IA (resumos gravados no banco em lote)
+                self.ai_processor.process_posts(posts)
             
-            return success
+            stats = self.ai_processor.get_statistics()
+            logger.info(
+                f"Processamento IA concluido - "
+                f"Total processados: {stats.get('total_processed', 0)}"
+            )
+            LoggerFactory.log_operation_end(logger, "Processamento com IA", True)
+            return True
             
         except Exception as exc:
             LoggerFactory.log_exception(logger, "Erro durante processamento IA", exc)
@@ -135,20 +180,8 @@ class Application:
                 LoggerFactory.log_operation_end(logger, "Integracao n8n", False)
                 return False
             
-            # Carrega posts do CSV
-            posts = self.csv_handler.load_posts()
-            
-            if not posts:
-                logger.warning("Nenhum post para enviar")
-                # Nao e erro: apenas nao ha nada para enviar.
-                LoggerFactory.log_operation_end(logger, "Integracao n8n", True)
-                return True
-            
-            # Filtra posts com resumo
-            posts_with_summary = [
-                post for post in posts 
-                if post.get('resumo') and post.get('resumo').strip()
-            ]
+            # Carrega posts resumidos ainda não entregues (filtro de resumo no SQL)
+            posts_with_summary = self.database.load_posts(stages=('summarized',), with_summary=True)
             
             if not posts_with_summary:
                 logger.warning("Nenhum post com resumo para enviar")
@@ -160,6 +193,9 @@ class Application:
             success = self.n8n_integration.send_posts(posts_with_summary)
             
             if success:
+                self.database.advance_stage(
+                    (post.get('link', '') for post in posts_with_summary), 'delivered'
+                )
                 logger.info(f"Enviados {len(posts_with_summary)} posts para n8n")
                 LoggerFactory.log_operation_end(logger, "Integracao n8n", True)
             else:
@@ -200,20 +236,37 @@ class Application:
         logger.info("Pipeline completo executado com sucesso")
         return True
     
+    def export_data(self) -> bool:
+        """
+        Exporta posts (CSV) e resumos (JSON) a partir do banco.
+        
+        Returns:
+            True se ambas as exportações tiveram sucesso
+        """
+        # Links herdados apenas de processados não têm conteúdo para exportar
+        posts = [post for post in self.database.load_posts() if post['title']]
+        if not posts:
+            logger.info("Nenhum post para exportar")
+            return True
+        
+        csv_ok = self.csv_handler.save_posts(posts)
+        json_ok = self.ai_processor.export_summaries_json()
+        return csv_ok and json_ok
+    
     def show_statistics(self) -> None:
         """Exibe estatísticas do sistema."""
         logger.info("=" * 70)
         logger.info("ESTATISTICAS DO SISTEMA")
         logger.info("=" * 70)
         
-        # Estatísticas CSV
-        csv_stats = self.csv_handler.get_statistics()
-        logger.info(f"Total de posts: {csv_stats['total_posts']}")
-        logger.info(f"Posts com resumo: {csv_stats['posts_with_summary']}")
-        logger.info(f"Posts sem resumo: {csv_stats['posts_without_summary']}")
+        # Estatísticas dos posts
+        post_stats = self.database.get_post_statistics()
+        logger.info(f"Total de posts: {post_stats['total_posts']}")
+        logger.info(f"Posts com resumo: {post_stats['posts_with_summary']}")
+        logger.info(f"Posts sem resumo: {post_stats['posts_without_summary']}")
         
         logger.info("\nDistribuicao por tipo:")
-        for post_type, count in csv_stats['post_types'].items():
+        for post_type, count in post_stats['post_types'].items():
             logger.info(f"  - {post_type}: {count}")
         
         # Estatísticas IA
@@ -235,10 +288,15 @@ def main():
         # - Para executar apenas processamento: app.run_ai_processing()
         # - Para executar apenas integração: app.run_n8n_integration()
         # - Para executar tudo: app.run_full_pipeline()
+        # - Para regerar CSV/JSON a partir do banco: app.export_data()
         
         # Executa pipeline completo
         success = app.run_full_pipeline()
         
+        # Exporta CSV/JSON a partir do banco (opcional: relê todos os posts)
+        if config.export_on_finish:
+            app.export_data()
+        
         # Exibe estatísticas
         app.show_statistics()
         
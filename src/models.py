@@ -0,0 +1,209 @@
+"""
+Módulo de Modelos
+=================
+Registro tipado de post compartilhado por todas as etapas do pipeline
+(scraper -> banco/CSV -> IA -> n8n).
+
+Author: Sistema AFN
+Date: 2025-12-09
+"""
+
+import math
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+
+def _clean(value: Any) -> str:
+    """
+    Normaliza valor de campo para string (None e NaN viram string vazia).
+    
+    Args:
+        value: Valor lido de dict, CSV, Parquet ou banco
+        
+    Returns:
+        Valor como string
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float) and math.isnan(value):
+        return ''
+    return value if isinstance(value, str) else str(value)
+
+
+class Post(Mapping):
+    """
+    Post com campos fixos em __slots__ (sem __dict__ por instância).
+    
+    Todos os campos são sempre strings: None e NaN viram '' na construção,
+    então post['resumo'].strip() nunca falha. post_type é internado, já que
+    poucos valores se repetem em milhares de posts. Implementa a interface
+    de Mapping (get, [], keys) para continuar compatível com o código e as
+    bibliotecas que recebem dicionários (pandas, csv.DictWriter).
+    """
+    
+    FIELDS = ('post_type', 'title', 'cover_image', 'link', 'resumo', 'data_resumo')
+    
+    __slots__ = FIELDS + ('extra',)
+    
+    def __init__(
+        self,
+        post_type: Any = '',
+        title: Any = '',
+        cover_image: Any = '',
+        link: Any = '',
+        resumo: Any = '',
+        data_resumo: Any = '',
+        **extra: Any
+    ):
+        """
+        Inicializa post.
+        
+        Args:
+            post_type: Tipo do post (Blog, News...)
+            title: Título
+            cover_image: URL da imagem de capa
+            link: URL do post (identificador)
+            resumo: Resumo gerado pela IA
+            data_resumo: Data de geração do resumo
+            **extra: Colunas adicionais preservadas do arquivo de origem
+        """
+        self.post_type = sys.intern(_clean(post_type))
+        self.title = _clean(title)
+        self.cover_image = _clean(cover_image)
+        self.link = _clean(link)
+        self.resumo = _clean(resumo)
+        self.data_resumo = _clean(data_resumo)
+        self.extra: Optional[Dict[str, str]] = (
+            {key: _clean(value) for key, value in extra.items()} if extra else None
+        )
+    
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> 'Post':
+        """
+        Cria post a partir de um dicionário (ou outro Post).
+        
+        Args:
+            data: Dados do post
+            
+        Returns:
+            Post
+        """
+        if isinstance(data, cls):
+            return data
+        return cls(**{str(key): value for key, value in data.items()})
+    
+    def __getitem__(self, key: str) -> str:
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.FIELDS:
+            value = _clean(value)
+            setattr(self, key, sys.intern(value) if key == 'post_type' else value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = _clean(value)
+    
+    def __iter__(self) -> Iterator[str]:
+        yield from self.FIELDS
+        if self.extra:
+            yield from self.extra
+    
+    def __len__(self) -> int:
+        return len(self.FIELDS) + (len(self.extra) if self.extra else 0)
+    
+    def update(self, data: Mapping) -> None:
+        """
+        Atualiza campos a partir de outro mapeamento.
+        
+        Args:
+            data: Campos a sobrescrever
+        """
+        for key, value in data.items():
+            self[key] = value
+    
+    def to_dict(self) -> Dict[str, str]:
+        """
+        Converte para dicionário simples.
+        
+        Returns:
+            Dicionário com todos os campos
+        """
+        return dict(self.items())
+    
+    def __repr__(self) -> str:
+        return f"Post(link={self.link!r}, post_type={self.post_type!r}, title={self.title!r})"
+
+
+class PostBatch(list):
+    """
+    Lista de Post com construtores eficientes a partir de DataFrame e registros.
+    
+    Subclasse de list: continua funcionando onde uma List[Dict] era esperada.
+    """
+    
+    __slots__ = ()
+    
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping]) -> 'PostBatch':
+        """
+        Cria lote a partir de dicionários.
+        
+        Args:
+            records: Posts como dicionários
+            
+        Returns:
+            PostBatch
+        """
+        return cls(Post.from_mapping(record) for record in records)
+    
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'PostBatch':
+        """
+        Cria lote a partir de DataFrame, sem passar por to_dict('records').
+        
+        Args:
+            df: DataFrame com colunas de post
+            
+        Returns:
+            PostBatch
+        """
+        columns = [str(col) for col in df.columns]
+        return cls(
+            Post(**dict(zip(columns, row)))
+            for row in df.itertuples(index=False, name=None)
+        )
+    
+    def links(self) -> List[str]:
+        """
+        Retorna links dos posts.
+        
+        Returns:
+            Lista de URLs
+        """
+        return [post.link for post in self]
+    
+    def to_records(self) -> List[Dict[str, str]]:
+        """
+        Converte posts para dicionários.
+        
+        Returns:
+            Lista de dicionários
+        """
+        return [post.to_dict() for post in self]
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Converte lote para DataFrame.
+        
+        Returns:
+            DataFrame com uma linha por post
+        """
+        return pd.DataFrame(self.to_records())
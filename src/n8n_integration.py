@@ -8,13 +8,16 @@ Date: 2025-12-09
 """
 
 import base64
-from typing import List, Dict, Optional
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Iterable, List, Dict, Optional
 from requests.exceptions import RequestException
 
 from src.config import config
+from src.image_cache import ImageCache
 from src.logger import get_logger
-from src.utils import ImageHandler
+from src.models import Post
+from src.utils import HTTPSession, ImageHandler
 
 
 logger = get_logger(__name__)
@@ -47,7 +50,7 @@ class N8NWebhookClient:
             True se sucesso
         """
         try:
-            response = requests.post(
+            response = HTTPSession.get().post(
                 self.webhook_url,
                 json=data,
                 timeout=self.timeout,
@@ -79,7 +82,7 @@ class N8NWebhookClient:
             True se webhook está acessível
         """
         try:
-            response = requests.post(
+            response = HTTPSession.get().post(
                 self.webhook_url,
                 json={"test": True},
                 timeout=5
@@ -102,14 +105,33 @@ class N8NWebhookClient:
 class PostFormatter:
     """Formatador de posts para envio ao n8n."""
     
+    _image_cache: Optional[ImageCache] = None
+    
+    @classmethod
+    def get_image_cache(cls) -> Optional[ImageCache]:
+        """
+        Retorna cache de imagens compartilhado (criado no primeiro uso).
+        
+        Returns:
+            ImageCache ou None se desabilitado na configuração
+        """
+        if cls._image_cache is None and config.image_cache_enabled:
+            cls._image_cache = ImageCache()
+        return cls._image_cache
+    
     @staticmethod
-    def format_post(post: Dict[str, str], include_image: bool = True) -> Dict:
+    def format_post(
+        post: Post,
+        include_image: bool = True,
+        images: Optional[Dict[str, Optional[bytes]]] = None
+    ) -> Dict:
         """
         Formata post para formato esperado pelo n8n.
         
         Args:
-            post: Dicionário com dados do post
+            post: Post a formatar
             include_image: Se deve incluir imagem binária
+            images: Imagens já baixadas por URL (ver prefetch_images)
             
         Returns:
             Post formatado
@@ -124,24 +146,100 @@ class PostFormatter:
         if include_image:
             image_url = post.get("cover_image", "")
             if image_url:
-                binary_data = PostFormatter._create_binary_block(image_url)
+                binary_data = PostFormatter._create_binary_block(image_url, images)
                 if binary_data:
                     formatted.update(binary_data)
         
         return formatted
     
     @staticmethod
-    def _create_binary_block(image_url: str) -> Optional[Dict]:
+    def _download_image(image_url: str) -> Optional[bytes]:
+        """
+        Baixa imagem, passando pelo cache em disco quando habilitado.
+        
+        Args:
+            image_url: URL da imagem
+            
+        Returns:
+            Bytes da imagem ou None em caso de erro
+        """
+        cache = PostFormatter.get_image_cache()
+        if cache:
+            return cache.get(image_url)
+        return ImageHandler.download_binary(image_url, timeout=config.image_download_timeout)
+    
+    @staticmethod
+    def prefetch_images(
+        urls: Iterable[str],
+        max_workers: int = None,
+        deadline: float = None
+    ) -> Dict[str, Optional[bytes]]:
+        """
+        Baixa imagens em paralelo, limitado por um prazo total.
+        
+        Cada download usa o timeout de download_timeout, sem repetir
+        leituras (HTTPSession.get_images); o prazo total limita o lote
+        inteiro. Imagens que não terminaram dentro do prazo
+        ficam como None (o download continua em segundo plano e, com o
+        cache habilitado, fica disponível na próxima entrega).
+        
+        Args:
+            urls: URLs das imagens (duplicadas são baixadas uma vez)
+            max_workers: Downloads simultâneos (usa config se não fornecido)
+            deadline: Prazo total em segundos (usa config se não fornecido)
+            
+        Returns:
+            Dicionário URL -> bytes (ou None se falhou ou estourou o prazo)
+        """
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        if not unique_urls:
+            return {}
+        
+        deadline = deadline if deadline is not None else config.image_batch_deadline
+        workers = min(max_workers or config.image_download_workers, len(unique_urls))
+        started = time.perf_counter()
+        
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {executor.submit(PostFormatter._download_image, url): url for url in unique_urls}
+        done, not_done = wait(futures, timeout=deadline)
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        images: Dict[str, Optional[bytes]] = {url: None for url in unique_urls}
+        for future in done:
+            try:
+                images[futures[future]] = future.result()
+            except Exception as exc:
+                logger.warning(f"Erro ao baixar imagem {futures[future]}: {str(exc)}")
+        
+        if not_done:
+            logger.warning(f"{len(not_done)} imagens nao baixadas dentro do prazo de {deadline}s")
+        
+        downloaded = sum(1 for image in images.values() if image)
+        logger.info(
+            f"Pre-carregadas {downloaded}/{len(unique_urls)} imagens em "
+            f"{time.perf_counter() - started:.1f}s ({workers} downloads simultaneos)"
+        )
+        return images
+    
+    @staticmethod
+    def _create_binary_block(
+        image_url: str,
+        images: Optional[Dict[str, Optional[bytes]]] = None
+    ) -> Optional[Dict]:
         """
         Cria bloco binário com imagem para n8n.
         
         Args:
             image_url: URL da imagem
+            images: Imagens já baixadas por URL (evita novo download)
             
         Returns:
             Dicionário com estrutura binary ou None
         """
-        image_binary = ImageHandler.download_binary(image_url)
+        if images is not None and image_url in images:
+            image_binary = images[image_url]
+        else:
+            image_binary = PostFormatter._download_image(image_url)
         
         if not image_binary:
             logger.warning(f"Nao foi possivel baixar imagem: {image_url}")
@@ -164,7 +262,7 @@ class PostFormatter:
             return None
     
     @staticmethod
-    def format_posts_batch(posts: List[Dict[str, str]], include_images: bool = True) -> List[Dict]:
+    def format_posts_batch(posts: List[Post], include_images: bool = True) -> List[Dict]:
         """
         Formata lote de posts.
         
@@ -177,11 +275,20 @@ class PostFormatter:
         """
         formatted_posts = []
         
+        # Baixa todas as capas em paralelo antes de formatar
+        images = None
+        if include_images:
+            images = PostFormatter.prefetch_images(post.get("cover_image", "") for post in posts)
+        
         for post in posts:
-            formatted = PostFormatter.format_post(post, include_images)
+            formatted = PostFormatter.format_post(post, include_images, images)
             formatted_posts.append(formatted)
         
         logger.info(f"Formatados {len(formatted_posts)} posts para envio")
+        
+        cache = PostFormatter.get_image_cache()
+        if include_images and cache:
+            cache.log_metrics()
         return formatted_posts
 
 
@@ -194,7 +301,7 @@ class N8NIntegration:
         self.formatter = PostFormatter()
         logger.info("N8NIntegration inicializada")
     
-    def send_posts(self, posts: List[Dict[str, str]], include_images: bool = True) -> bool:
+    def send_posts(self, posts: List[Post], include_images: bool = True) -> bool:
         """
         Envia posts para n8n.
         
@@ -244,7 +351,7 @@ class N8NIntegration:
         logger.info("Testando integracao com n8n...")
         return self.client.test_connection()
     
-    def send_single_post(self, post: Dict[str, str], include_image: bool = True) -> bool:
+    def send_single_post(self, post: Post, include_image: bool = True) -> bool:
         """
         Envia post individual para n8n.
         
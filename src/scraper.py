@@ -23,7 +23,9 @@ from selenium.common.exceptions import TimeoutException, WebDriverException
 
 from src.config import config
 from src.logger import get_logger
+from src.models import Post
 from src.utils import HTMLParser, TextCleaner, URLNormalizer
+from src.article_extractor import ArticleContentProvider
 
 
 logger = get_logger(__name__)
@@ -234,8 +236,10 @@ class PostExtractor:
             driver: Instância do driver Selenium
         """
         self.driver = driver
+        # Reaproveita o HTML das paginas individuais para o resumo com IA
+        self.article_provider = ArticleContentProvider() if config.article_enabled else None
     
-    def extract_posts_from_page(self, html: str) -> List[Dict[str, str]]:
+    def extract_posts_from_page(self, html: str) -> List[Post]:
         """
         Extrai posts da página HTML.
         
@@ -243,13 +247,13 @@ class PostExtractor:
             html: Código HTML da página
             
         Returns:
-            Lista de dicionários com dados dos posts
+            Lista de posts
         """
         soup = BeautifulSoup(html, "html.parser")
         anchors = soup.select("a[href*='/blog/']")
         
         seen_links: Set[str] = set()
-        results: List[Dict[str, str]] = []
+        results: List[Post] = []
         
         logger.info(f"Encontrados {len(anchors)} links de blog na pagina")
         
@@ -261,7 +265,7 @@ class PostExtractor:
         logger.info(f"Extraidos {len(results)} posts unicos")
         return results
     
-    def _extract_post_data(self, anchor, seen_links: Set[str]) -> Optional[Dict[str, str]]:
+    def _extract_post_data(self, anchor, seen_links: Set[str]) -> Optional[Post]:
         """
         Extrai dados de um único post.
         
@@ -270,7 +274,7 @@ class PostExtractor:
             seen_links: Set de links já processados
             
         Returns:
-            Dicionário com dados do post ou None
+            Post extraído ou None
         """
         href = anchor.get("href")
         if not href:
@@ -303,12 +307,12 @@ class PostExtractor:
                 cover_image = cover_image or additional_data.get("cover_image", "")
                 title = title or additional_data.get("title", "")
         
-        return {
-            "post_type": post_type or "Unknown",
-            "title": TextCleaner.clean_title(title),
-            "cover_image": cover_image,
-            "link": link
-        }
+        return Post(
+            post_type=post_type or "Unknown",
+            title=TextCleaner.clean_title(title),
+            cover_image=cover_image,
+            link=link
+        )
     
     def _find_parent_card(self, element) -> Optional[BeautifulSoup]:
         """
@@ -381,6 +385,9 @@ class PostExtractor:
             page_html = self.driver.get_page_source()
             soup = BeautifulSoup(page_html, "html.parser")
             
+            if self.article_provider:
+                self.article_provider.store_html(link, page_html)
+            
             # Extrai imagem
             cover_image = HTMLParser.extract_meta_image(page_html) or ""
             
@@ -418,7 +425,7 @@ class DatabricksScraper:
         self.extractor = PostExtractor(self.driver)
         logger.info("DatabricksScraper inicializado")
     
-    def scrape_posts(self, filter_types: Union[str, List[str], None] = None) -> List[Dict[str, str]]:
+    def scrape_posts(self, filter_types: Union[str, List[str], None] = None) -> List[Post]:
         """
         Executa scraping de posts.
         
@@ -481,7 +488,7 @@ class DatabricksScraper:
             logger.error(f"Erro durante scraping: {str(exc)}", exc_info=True)
             raise
     
-    def _remove_duplicates(self, posts: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    def _remove_duplicates(self, posts: List[Post]) -> List[Post]:
         """Remove posts duplicados baseado no link."""
         seen = set()
         unique = []
@@ -8,16 +8,112 @@ Date: 2025-12-09
 """
 
 import base64
+import os
 import re
+import stat
+import tempfile
+import threading
 import requests
-from typing import Optional
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from src.config import config
 from src.logger import get_logger
 
 
 logger = get_logger(__name__)
 
 
+class HTTPSession:
+    """
+    Sessão HTTP compartilhada com keep-alive, pool de conexões e retries.
+    
+    Chamadas avulsas a requests.get/post abrem uma conexão TCP (e TLS) nova
+    a cada requisição; a sessão reaproveita conexões por host.
+    """
+    
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    
+    _session: Optional[requests.Session] = None
+    _image_session: Optional[requests.Session] = None
+    _lock = threading.Lock()
+    
+    @classmethod
+    def get(cls) -> requests.Session:
+        """
+        Retorna sessão compartilhada (criada no primeiro uso).
+        
+        Returns:
+            Sessão configurada a partir da seção [http]
+        """
+        if cls._session is None:
+            with cls._lock:
+                if cls._session is None:
+                    cls._session = cls.create()
+        return cls._session
+    
+    @classmethod
+    def get_images(cls) -> requests.Session:
+        """
+        Retorna sessão compartilhada para download de imagens.
+        
+        Não repete leituras: um GET de imagem que estoura o timeout de
+        leitura falha em 1x o timeout em vez de (1 + retries)x, o que
+        mantém o prefetch dentro do prazo. Erros de conexão e status
+        429/5xx continuam sendo repetidos.
+        
+        Returns:
+            Sessão configurada a partir da seção [http], sem retry de leitura
+        """
+        if cls._image_session is None:
+            with cls._lock:
+                if cls._image_session is None:
+                    cls._image_session = cls.create(read_retries=0)
+        return cls._image_session
+    
+    @classmethod
+    def create(
+        cls,
+        pool_size: int = None,
+        retries: int = None,
+        backoff_factor: float = None,
+        read_retries: int = None
+    ) -> requests.Session:
+        """
+        Cria sessão com adaptador de pool e política de retry.
+        
+        Apenas métodos idempotentes são repetidos (POST ao n8n não é).
+        
+        Args:
+            pool_size: Conexões mantidas por host (usa config se não fornecido)
+            retries: Tentativas extras em erro de conexão ou status 429/5xx
+            backoff_factor: Fator de espera exponencial entre tentativas
+            read_retries: Tentativas extras após erro de leitura, como timeout
+                de resposta (limitadas apenas por retries se não fornecido)
+            
+        Returns:
+            Sessão configurada
+        """
+        retry = Retry(
+            total=retries if retries is not None else config.http_retries,
+            read=read_retries,
+            backoff_factor=backoff_factor if backoff_factor is not None else config.http_backoff_factor,
+            status_forcelist=cls.RETRY_STATUS,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False
+        )
+        pool_size = pool_size or config.http_pool_size
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+
 class ImageHandler:
     """Gerenciador de operações com imagens."""
     
@@ -37,7 +133,7 @@ class ImageHandler:
             return None
         
         try:
-            response = requests.get(url, timeout=timeout)
+            response = HTTPSession.get_images().get(url, timeout=timeout)
             response.raise_for_status()
             
             encoded = base64.b64encode(response.content).decode("utf-8")
@@ -64,7 +160,7 @@ class ImageHandler:
             return None
         
         try:
-            response = requests.get(url, timeout=timeout)
+            response = HTTPSession.get_images().get(url, timeout=timeout)
             response.raise_for_status()
             
             logger.debug(f"Imagem baixada (binário): {url}")
@@ -204,3 +300,90 @@ class URLNormalizer:
         from urllib.parse import urljoin
         return urljoin(base_url, url)
 
+
+class AtomicFile:
+    """
+    Escrita atômica de arquivos (arquivo temporário + fsync + rename).
+    
+    O conteúdo é gravado em um temporário no mesmo diretório e só substitui
+    o destino com os.replace depois de fsync. Se o processo morrer no meio
+    da escrita, o arquivo anterior continua intacto. Leitores nunca esperam:
+    quem abrir o arquivo durante a escrita lê o snapshot anterior.
+    """
+    
+    @staticmethod
+    @contextmanager
+    def temp_path(path: Union[str, Path]) -> Iterator[Path]:
+        """
+        Fornece caminho temporário para bibliotecas que gravam por caminho.
+        
+        O destino só é substituído se o bloco terminar sem exceção; caso
+        contrário o temporário é removido.
+        
+        Args:
+            path: Arquivo de destino
+            
+        Yields:
+            Caminho temporário no mesmo diretório do destino
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=path.parent)
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        try:
+            # mkstemp cria com 0600; mantém as permissões do arquivo substituído
+            os.chmod(tmp_path, stat.S_IMODE(path.stat().st_mode) if path.exists() else 0o644)
+            yield tmp_path
+            AtomicFile._fsync_path(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        AtomicFile._fsync_directory(path.parent)
+    
+    @staticmethod
+    @contextmanager
+    def open(
+        path: Union[str, Path],
+        mode: str = 'w',
+        encoding: Optional[str] = 'utf-8',
+        newline: Optional[str] = None
+    ) -> Iterator[IO]:
+        """
+        Abre arquivo para escrita atômica.
+        
+        Args:
+            path: Arquivo de destino
+            mode: 'w' (texto) ou 'wb' (binário)
+            encoding: Codificação (ignorada em modo binário)
+            newline: Controle de fim de linha, como em open()
+            
+        Yields:
+            Arquivo temporário aberto para escrita
+        """
+        if 'b' in mode:
+            encoding = None
+        with AtomicFile.temp_path(path) as tmp_path:
+            with open(tmp_path, mode, encoding=encoding, newline=newline) as f:
+                yield f
+    
+    @staticmethod
+    def _fsync_path(path: Path) -> None:
+        """Força gravação do arquivo em disco."""
+        with open(path, 'rb') as f:
+            os.fsync(f.fileno())
+    
+    @staticmethod
+    def _fsync_directory(directory: Path) -> None:
+        """Persiste a entrada do rename no diretório (ignorado onde não suportado)."""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)